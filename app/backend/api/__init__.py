@@ -1,5 +1,6 @@
 from .auth import auth_bp
 from .posts import posts_bp
+from .uploads import uploads_bp
 from .feed import feed_bp
 from .jobs import jobs_bp
 from .messaging import messaging_bp
@@ -7,6 +8,7 @@ from .messaging import messaging_bp
 __all__ = [
     'auth_bp',
     'posts_bp',
+    'uploads_bp',
     'feed_bp',
     'jobs_bp',
     'messaging_bp'
@@ -4,15 +4,23 @@ from models.user import User
 from models import db
 from werkzeug.security import check_password_hash
 import re
-import os
-import time
-from werkzeug.utils import secure_filename
 from PIL import Image
 from models.post import Post
+from api.posts import with_author, get_media_variants, get_media_url
+from services.http_cache import conditional
+from services import media, media_jobs, images, cdn
 
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+AVATAR_LIST_SIZE = 80  # 40px circles on 2x screens
+
+def get_avatar_url(avatar, size):
+    """URL of the smallest avatar rendition that covers size px (until the worker renders it, /uploads redirects to the original)"""
+    if not avatar or not images.is_image(avatar):
+        return None
+    if '/' in avatar:
+        return avatar  # external image URL, nothing to resize
+    return get_media_url(images.avatar_for_size(avatar, size))
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -68,13 +76,27 @@ def login():
     access_token = create_access_token(identity=str(user.id))
     return jsonify({'token': access_token, 'user': {'id': user.id, 'username': user.username, 'email': user.email}}), 200 
 
+PROFILE_FIELDS = ['id', 'username', 'email', 'title', 'location', 'bio', 'skills', 'experience', 'education', 'phone', 'linkedin', 'github', 'twitter', 'avatar']
+
+def serialize_profile(user):
+    profile = {k: getattr(user, k) for k in PROFILE_FIELDS}
+    # Signed link to the avatar; clients should use this rather than building /uploads URLs
+    profile['avatar_url'] = get_media_url(user.avatar) if user.avatar and '/' not in user.avatar else user.avatar
+    return profile
+
+def profile_version():
+    """Per-user profile version, bumped on every profile or avatar change (plus the media link version)"""
+    version = db.session.query(User.profile_version).filter_by(id=get_jwt_identity()).scalar()
+    return f'{version}:{cdn.link_version()}'
+
 @auth_bp.route('/api/profile', methods=['GET'])
 @jwt_required()
+@conditional(profile_version)
 def get_profile():
     user = get_user()
     if not user:
         return jsonify({'msg': 'User not found'}), 404
-    profile = {k: getattr(user, k) for k in ['id', 'username', 'email', 'title', 'location', 'bio', 'skills', 'experience', 'education', 'phone', 'linkedin', 'github', 'twitter', 'avatar']}
+    profile = serialize_profile(user)
     return jsonify(profile), 200
 
 @auth_bp.route('/api/profile', methods=['PUT'])
@@ -88,10 +110,11 @@ def update_profile():
         for field in ['title', 'location', 'bio', 'skills', 'experience', 'education', 'phone', 'linkedin', 'github', 'twitter']:
             if field in data:
                 setattr(user, field, data[field])
+        user.bump_profile_version()
         db.session.commit()
     except ValueError as e:
         return jsonify({'msg': str(e)}), 400
-    profile = {k: getattr(user, k) for k in ['id', 'username', 'email', 'title', 'location', 'bio', 'skills', 'experience', 'education', 'phone', 'linkedin', 'github', 'twitter', 'avatar']}
+    profile = serialize_profile(user)
     return jsonify(profile), 200
 
 @auth_bp.route('/api/profile/image', methods=['POST'])
@@ -100,24 +123,40 @@ def upload_profile_image():
     user = get_user()
     if not user:
         return jsonify({'msg': 'User not found'}), 404
-    if 'image' not in request.files:
-        return jsonify({'msg': 'No file part'}), 400
-    file = request.files['image']
-    if file.filename == '':
-        return jsonify({'msg': 'No selected file'}), 400
-    if not ('.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg'}):
-        return jsonify({'msg': 'Invalid file type'}), 400
-    filename = secure_filename(f"{user.id}_{int(time.time())}.{file.filename.rsplit('.', 1)[1].lower()}")
-    # Save to the same uploads directory as main.py
-    upload_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
-    os.makedirs(upload_folder, exist_ok=True)
-    file.save(os.path.join(upload_folder, filename))
+    media.limit_upload(MAX_FILE_SIZE)
+    if request.form.get('media_key'):
+        # Uploaded straight to object storage with a presigned URL (POST /api/uploads/direct)
+        if not request.form['media_key'].lower().endswith(('.png', '.jpg', '.jpeg')):
+            return jsonify({'msg': 'Invalid file type'}), 400
+        try:
+            filename = media.check_direct_upload(request.form['media_key'], user.id, MAX_FILE_SIZE)
+        except media.UnknownUpload as e:
+            return jsonify({'msg': str(e)}), 400
+        except media.UnsupportedMediaType:
+            return jsonify({'msg': 'Invalid file type'}), 400
+    else:
+        if 'image' not in request.files:
+            return jsonify({'msg': 'No file part'}), 400
+        file = request.files['image']
+        if file.filename == '':
+            return jsonify({'msg': 'No selected file'}), 400
+        if not ('.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg'}):
+            return jsonify({'msg': 'Invalid file type'}), 400
+        try:
+            filename = media.store_upload(file, MAX_FILE_SIZE)
+        except media.UnsupportedMediaType:
+            return jsonify({'msg': 'Invalid file type'}), 400
+    media.acquire(filename)
+    # The media worker writes the fixed-size squares; /uploads serves the original until they exist
+    media_jobs.enqueue(filename, avatar=True)
+    media.release(user.avatar)
     user.avatar = filename
+    user.bump_profile_version()
     db.session.commit()
-    profile = {k: getattr(user, k) for k in ['id', 'username', 'email', 'title', 'location', 'bio', 'skills', 'experience', 'education', 'phone', 'linkedin', 'github', 'twitter', 'avatar']}
+    profile = serialize_profile(user)
     print(f"[DEBUG] Uploaded avatar filename: {filename}")
     print(f"[DEBUG] Returned profile: {profile}")
-    return jsonify({'url': f'/uploads/{filename}', 'profile': profile}), 200 
+    return jsonify({'url': get_media_url(filename), 'profile': profile}), 200 
 
 @auth_bp.route('/api/profile/image', methods=['DELETE'])
 @jwt_required()
@@ -126,12 +165,10 @@ def delete_profile_image():
     if not user:
         return jsonify({'msg': 'User not found'}), 404
     if user.avatar:
-        # Remove the file from uploads
-        upload_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
-        file_path = os.path.join(upload_folder, user.avatar)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        # Drop the reference; the file is removed once nothing else uses it
+        media.release(user.avatar)
         user.avatar = None
+        user.bump_profile_version()
         db.session.commit()
     return jsonify({'success': True}), 200
 
@@ -144,7 +181,7 @@ def debug_all_data():
     if not user or user.username != 'admin':
         return jsonify({'msg': 'Unauthorized'}), 403
     users = User.query.all()
-    posts = Post.query.all()
+    posts = with_author(Post.query).all()
     return jsonify({
         'users': [
             {
@@ -168,6 +205,7 @@ def debug_all_data():
             {
                 'id': p.id,
                 'user_id': p.user_id,
+                'username': p.user.username if p.user else None,
                 'title': p.title,
                 'content': p.content,
                 'media_url': p.media_url,
@@ -181,6 +219,8 @@ def debug_all_data():
 @jwt_required()
 def get_all_users():
     current_user_id = get_jwt_identity()
+    # Display size of the avatars on the client, in px (already multiplied by its pixel ratio)
+    avatar_size = request.args.get('avatar_size', AVATAR_LIST_SIZE, type=int)
     users = User.query.filter(User.id != current_user_id).all()
     result = []
     for user in users:
@@ -190,6 +230,8 @@ def get_all_users():
             'title': user.title,
             'location': user.location,
             'avatar': user.avatar,
+            'avatar_url': get_avatar_url(user.avatar, avatar_size),
+            'avatar_variants': get_media_variants(user.avatar),
             'bio': user.bio,
         })
     return jsonify({'users': result}), 200 
\ No newline at end of file
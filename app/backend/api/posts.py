@@ -1,48 +1,137 @@
-from flask import Blueprint, request, jsonify, url_for
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db
-from models.post import Post
+from models.post import Post, PostTag, TagCount
 from models.user import User
-import os
-import time
-from werkzeug.utils import secure_filename
-from sqlalchemy import or_, desc, asc
-from functools import lru_cache
+from services.search import get_search_backend
+from services.cache import get_cache
+from services.http_cache import conditional
+from services.view_counter import get_view_counter
+from services.storage import get_storage
+from services import media, images, media_jobs, resumable, video, cdn
+import json
+import base64
+from datetime import datetime
+from sqlalchemy import or_, and_, desc, asc, func, select
+from sqlalchemy.orm import joinedload
 from flask import after_this_request
 
 posts_bp = Blueprint('posts', __name__)
  
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'mov', 'avi', 'webm'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+POPULAR_TAGS_LIMIT = 50
+MAX_PER_PAGE = 100
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# The only sorts get_posts accepts. Every one orders by (column, id), which a
+# (column, id) index serves for unfiltered listings. Filtered listings have
+# (filter column, column, id) indexes only for the common pairs (newest by
+# category, visibility or user, most liked by category); see models/post.py.
+# Other combinations filter on one index and sort the matching rows.
+SORT_COLUMNS = {
+    'created_at': Post.created_at,
+    'likes_count': Post.likes_count,
+    'views_count': Post.views_count,
+}
+SORT_ORDERS = ('asc', 'desc')
+
+def encode_cursor(sort_by, sort_order, post):
+    """Build an opaque cursor pointing just past the given post"""
+    value = getattr(post, sort_by)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'s': sort_by, 'o': sort_order, 'v': value, 'id': post.id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_by, sort_order):
+    """Return (value, id) from a cursor, or raise ValueError if it is invalid"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        value, post_id = data['v'], int(data['id'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor.')
+    if data.get('s') != sort_by or data.get('o') != sort_order:
+        raise ValueError('Cursor does not match the requested sort.')
+    try:
+        value = datetime.fromisoformat(value) if sort_by == 'created_at' else int(value)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor.')
+    return value, post_id
+
+def apply_sort(query, sort_by, sort_order):
+    """Order by (sort column, id) so the order matches the composite indexes and is stable"""
+    sort_column = SORT_COLUMNS[sort_by]
+    if sort_order == 'asc':
+        return query.order_by(asc(sort_column), asc(Post.id))
+    return query.order_by(desc(sort_column), desc(Post.id))
+
+def apply_cursor(query, sort_by, sort_order, cursor):
+    """Order by (sort column, id) and seek past the cursor position"""
+    sort_column = SORT_COLUMNS[sort_by]
+    query = apply_sort(query, sort_by, sort_order)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by, sort_order)
+        if sort_order == 'asc':
+            query = query.filter(or_(sort_column > value, and_(sort_column == value, Post.id > last_id)))
+        else:
+            query = query.filter(or_(sort_column < value, and_(sort_column == value, Post.id < last_id)))
+    return query
+
 def get_media_url(filename):
     if not filename:
         return None
-    return url_for('uploaded_file', filename=filename, _external=True)
+    # With object storage clients fetch straight from the bucket, otherwise from the media origin
+    return get_storage().url(filename) or cdn.media_url(filename)
+
+def get_video_info(post):
+    """Poster URL, duration and size of a probed video post, so clients can lazy-load the video"""
+    if not video.is_video(post.media_url) or post.media_width is None:
+        return None
+    return {
+        'poster_url': get_media_url(video.poster_name(post.media_url)),
+        'duration': post.media_duration,
+        'width': post.media_width,
+        'height': post.media_height
+    }
+
+def get_media_variants(filename):
+    """URLs of the resized renditions of an image upload, keyed by width or 'thumb'"""
+    if not images.is_image(filename):
+        return None
+    return {name: get_media_url(variant) for name, variant in images.variant_names(filename).items()}
 
-# Simple in-memory cache for categories and tags
-@lru_cache(maxsize=1)
+# Categories and tags are cached in the shared cache under the 'posts' scope
 def get_cached_categories():
-    return sorted(set([p.category for p in Post.query.distinct(Post.category) if p.category]))
+    def compute():
+        return sorted(set([p.category for p in Post.query.distinct(Post.category) if p.category]))
+    return get_cache().get_or_compute('posts', 'categories', compute)
 
-@lru_cache(maxsize=1)
 def get_cached_tags():
-    tags = {}
-    for p in Post.query.distinct(Post.tags):
-        if p.tags:
-            for t in [tag.strip() for tag in p.tags.split(',') if tag.strip()]:
-                tags[t] = tags.get(t, 0) + 1
-    # Return tags sorted by popularity (count desc)
-    return [t for t, _ in sorted(tags.items(), key=lambda x: -x[1])]
+    def compute():
+        # Return tags sorted by popularity (count desc), read off the tag_counts index
+        rows = (db.session.query(TagCount.tag)
+                .filter(TagCount.count > 0)
+                .order_by(TagCount.count.desc(), TagCount.tag)
+                .limit(POPULAR_TAGS_LIMIT))
+        return [tag for tag, in rows]
+    return get_cache().get_or_compute('posts', 'tags', compute)
+
+def posts_version():
+    """Version stamp for anything derived from the posts table: (last edit, row count, total views, media link version)
+
+    Views only ever grow, so their total changes with every flush, in whichever worker it happened.
+    """
+    last_updated, count, views = db.session.query(func.max(Post.updated_at), func.count(Post.id),
+                                                  func.sum(Post.views_count)).one()
+    return f'{last_updated}:{count}:{views}:{cdn.link_version()}'
 
 @posts_bp.route('/api/posts/categories', methods=['GET'])
 @jwt_required()
+@conditional(posts_version)
 def get_categories():
     return jsonify({'categories': get_cached_categories()}), 200
 
@@ -51,11 +140,36 @@ def get_categories():
 def get_popular_tags():
     return jsonify({'tags': get_cached_tags()}), 200
 
+# Total-count strategies for listings:
+#   exact  - COUNT(*) on the filtered query every request
+#   cached - COUNT(*) memoized per normalized filter signature for a short TTL
+#   none   - no total; the page is fetched with one extra row to report has_more
+COUNT_MODES = ('exact', 'cached', 'none')
+
+def count_signature(viewer_id, category=None, exclude_user_id=None, search=None, tags=None, visibility=None, user_id=None):
+    """Normalize listing filters so equivalent requests share one cached count"""
+    tag_list = sorted({t.strip().lower() for t in tags.split(',') if t.strip()}) if tags else []
+    return (
+        viewer_id,  # private posts are counted for their author only
+        category or None,
+        visibility or None,
+        str(user_id) if user_id else None,
+        str(exclude_user_id) if exclude_user_id else None,
+        search.strip().lower() if search and search.strip() else None,
+        tuple(tag_list),
+    )
+
+def get_total_count(query, mode, signature):
+    if mode == 'exact':
+        return query.enable_eagerloads(False).order_by(None).count()
+    key = 'count:' + json.dumps(signature)
+    return get_cache().get_or_compute('posts', key, lambda: query.enable_eagerloads(False).order_by(None).count(),
+                                      ttl=current_app.config['POSTS_COUNT_CACHE_TTL'])
+
 # Invalidate cache when posts are created, updated, or deleted
 
 def invalidate_post_cache():
-    get_cached_categories.cache_clear()
-    get_cached_tags.cache_clear()
+    get_cache().invalidate('posts')
 
 @posts_bp.route('/api/posts', methods=['POST'])
 @jwt_required()
@@ -64,6 +178,8 @@ def create_post():
     user = User.query.get(user_id)
     if not user:
         return jsonify({'msg': 'User not found'}), 404
+    # Media is streamed to disk and size-checked while the form is parsed
+    media.limit_upload(MAX_FILE_SIZE)
 
     title = request.form.get('title', '').strip()
     content = request.form.get('content', '').strip()
@@ -72,21 +188,41 @@ def create_post():
         return jsonify({'msg': 'Title and content are required.'}), 400
 
     media_url = None
+    media_status = None
     if 'media' in request.files:
         file = request.files['media']
         if file and allowed_file(file.filename):
-            file.seek(0, os.SEEK_END)
-            file_length = file.tell()
-            file.seek(0)
-            if file_length > MAX_FILE_SIZE:
-                return jsonify({'msg': 'File too large (max 10MB).'}), 400
-            filename = secure_filename(f"{user.id}_{int(time.time())}_" + file.filename)
-            file.save(os.path.join(UPLOAD_FOLDER, filename))
-            media_url = filename
+            try:
+                media_url = media.store_upload(file, MAX_FILE_SIZE)
+            except media.UnsupportedMediaType:
+                return jsonify({'msg': 'Invalid media file type.'}), 400
+            media.acquire(media_url)
+            # Derived assets are built by media_worker.py; the request returns once the original is stored
+            media_status = 'processing' if media_jobs.enqueue(media_url) else 'ready'
         elif file.filename:
             return jsonify({'msg': 'Invalid media file type.'}), 400
+    elif request.form.get('upload_id'):
+        # A finished resumable upload (api/uploads.py) is already stored; just take it over
+        try:
+            media_url = resumable.claim(request.form['upload_id'], user.id)
+        except resumable.UploadError as e:
+            return jsonify({'msg': str(e)}), 400
+        media_status = 'processing' if media_jobs.enqueue(media_url) else 'ready'
+    elif request.form.get('media_key'):
+        # Uploaded straight to object storage with a presigned URL (POST /api/uploads/direct)
+        try:
+            media_url = media.check_direct_upload(request.form['media_key'], user.id, MAX_FILE_SIZE)
+        except media.UnknownUpload as e:
+            return jsonify({'msg': str(e)}), 400
+        except media.UnsupportedMediaType:
+            return jsonify({'msg': 'Invalid media file type.'}), 400
+        media.acquire(media_url)
+        media_status = 'processing' if media_jobs.enqueue(media_url) else 'ready'
 
-    post = Post(user_id=user.id, title=title, content=content, media_url=media_url, visibility=visibility)
+    post = Post(user_id=user.id, title=title, content=content, media_url=media_url, media_status=media_status,
+                visibility=visibility)
+    post.set_tags(request.form.get('tags'))
+    video.copy_known_metadata(post)
     db.session.add(post)
     db.session.commit()
     invalidate_post_cache()
@@ -97,65 +233,153 @@ def create_post():
         'title': post.title,
         'content': post.content,
         'media_url': get_media_url(post.media_url),
+        'media_status': post.media_status,
         'visibility': post.visibility,
+        'tags': [t.strip() for t in post.tags.split(',')] if post.tags else [],
         'created_at': post.created_at,
         'updated_at': post.updated_at
     }), 201
 
+def filter_by_tags(query, tags):
+    """Keep posts carrying every requested tag, using the (tag, post_id) index"""
+    tag_list = Post.normalize_tags(tags)
+    if not tag_list:
+        return query
+    matching = (select(PostTag.post_id)
+                .where(PostTag.tag.in_(tag_list))
+                .group_by(PostTag.post_id)
+                .having(func.count(PostTag.tag) == len(tag_list)))
+    return query.filter(Post.id.in_(matching))
+
+def visible_to(query, viewer_id):
+    """Other users' posts only when Public (posts from before visibility existed count as Public)"""
+    return query.filter(or_(Post.user_id == viewer_id, Post.visibility == 'Public', Post.visibility.is_(None)))
+
+def with_author(query):
+    """Load the author's username in the same SELECT instead of one lazy query per row"""
+    return query.options(joinedload(Post.user).load_only(User.id, User.username))
+
+def serialize_post(post):
+    # Renditions are only linked once the media worker has written them (see get_media_status)
+    ready = post.media_status == 'ready'
+    return {
+        'id': post.id,
+        'user_id': post.user_id,
+        'username': post.user.username if post.user else None,
+        'title': post.title,
+        'content': post.content,
+        'media_url': get_media_url(post.media_url),
+        'media_variants': get_media_variants(post.media_url) if ready else None,
+        'media_status': post.media_status,
+        'video': get_video_info(post) if ready else None,
+        'category': post.category,
+        'visibility': post.visibility,
+        'tags': [t.strip() for t in post.tags.split(',')] if post.tags else [],
+        'likes_count': post.likes_count,
+        'views_count': post.views_count,
+        'created_at': post.created_at,
+        'updated_at': post.updated_at
+    }
+
 @posts_bp.route('/api/posts', methods=['GET'])
 @jwt_required()
+@conditional(posts_version)
 def get_posts():
     # Query params
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    # get(type=int) gives None for non-integers; a default is only for absent parameters
+    page = request.args.get('page', type=int) if 'page' in request.args else 1
+    per_page = request.args.get('per_page', type=int) if 'per_page' in request.args else 10
     category = request.args.get('category')
     search = request.args.get('search')
     tags = request.args.get('tags')  # comma-separated
     sort_by = request.args.get('sort_by', 'created_at')
     sort_order = request.args.get('sort_order', 'desc')
+    visibility = request.args.get('visibility')
     exclude_user_id = request.args.get('exclude_user_id')
+    user_id = request.args.get('user_id')
+    if page is None or page < 1:
+        return jsonify({'msg': 'page must be a positive integer.'}), 400
+    if per_page is None or not 1 <= per_page <= MAX_PER_PAGE:
+        return jsonify({'msg': f'per_page must be an integer from 1 to {MAX_PER_PAGE}.'}), 400
+    if sort_by not in SORT_COLUMNS and not (sort_by == 'relevance' and search):
+        return jsonify({'msg': f'Unsupported sort_by. Use one of: {", ".join(SORT_COLUMNS)}' +
+                               (', relevance.' if search else '.')}), 400
+    if sort_order not in SORT_ORDERS:
+        return jsonify({'msg': 'sort_order must be asc or desc.'}), 400
+    count_mode = request.args.get('count', current_app.config['POSTS_COUNT_MODE'])
+    if count_mode not in COUNT_MODES:
+        return jsonify({'msg': f'count must be one of {", ".join(COUNT_MODES)}.'}), 400
 
-    query = Post.query
+    viewer_id = int(get_jwt_identity())
+    # Private posts (and their signed media links) are only listed for their author
+    query = visible_to(with_author(Post.query), viewer_id)
     if category:
         query = query.filter(Post.category == category)
+    if visibility:
+        query = query.filter(Post.visibility == visibility)
+    if user_id:
+        query = query.filter(Post.user_id == int(user_id))
     if exclude_user_id:
         query = query.filter(Post.user_id != int(exclude_user_id))
+    # With a search term and no explicit sort, results come back by relevance
+    rank = bool(search) and (sort_by == 'relevance' or ('sort_by' not in request.args and 'cursor' not in request.args))
     if search:
-        like = f"%{search.lower()}%"
-        query = query.filter(or_(Post.title.ilike(like), Post.content.ilike(like)))
+        query = get_search_backend().apply(query, search, rank=rank)
     if tags:
-        tag_list = [t.strip() for t in tags.split(',') if t.strip()]
-        for tag in tag_list:
-            query = query.filter(Post.tags.ilike(f"%{tag}%"))
+        query = filter_by_tags(query, tags)
+    signature = count_signature(viewer_id, category, exclude_user_id, search, tags, visibility, user_id)
+    total = None
+    # Keyset pagination: ?cursor= (empty for the first page) seeks on (sort column, id)
+    if 'cursor' in request.args:
+        if sort_by not in SORT_COLUMNS:
+            return jsonify({'msg': f'Cursor pagination does not support sort_by={sort_by}.'}), 400
+        if count_mode != 'none' and 'count' in request.args:
+            total = get_total_count(query, count_mode, signature)
+        try:
+            query = apply_cursor(query, sort_by, sort_order, request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'msg': str(e)}), 400
+        posts = query.limit(per_page + 1).all()
+        has_more = len(posts) > per_page
+        posts = posts[:per_page]
+        next_cursor = encode_cursor(sort_by, sort_order, posts[-1]) if has_more else None
+        result = [serialize_post(post) for post in posts]
+        if search:
+            snippets = get_search_backend().snippets(posts, search)
+            for item in result:
+                item['snippet'] = snippets.get(item['id'])
+        return jsonify({
+            'posts': result,
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+            'total': total,
+            'per_page': per_page,
+            'categories': get_cached_categories(),
+            'tags': get_cached_tags()
+        }), 200
     # Sorting
-    sort_column = getattr(Post, sort_by, Post.created_at)
-    if sort_order == 'asc':
-        query = query.order_by(asc(sort_column))
+    if rank:
+        query = query.order_by(desc(Post.id))
     else:
-        query = query.order_by(desc(sort_column))
+        query = apply_sort(query, sort_by, sort_order)
     # Pagination
-    total = query.count()
-    posts = query.offset((page - 1) * per_page).limit(per_page).all()
-    result = []
-    for post in posts:
-        result.append({
-            'id': post.id,
-            'user_id': post.user_id,
-            'username': post.user.username if post.user else None,
-            'title': post.title,
-            'content': post.content,
-            'media_url': get_media_url(post.media_url),
-            'category': post.category,
-            'visibility': post.visibility,
-            'tags': [t.strip() for t in post.tags.split(',')] if post.tags else [],
-            'likes_count': post.likes_count,
-            'views_count': post.views_count,
-            'created_at': post.created_at,
-            'updated_at': post.updated_at
-        })
+    if count_mode == 'none':
+        posts = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+        has_more = len(posts) > per_page
+        posts = posts[:per_page]
+    else:
+        total = get_total_count(query, count_mode, signature)
+        posts = query.offset((page - 1) * per_page).limit(per_page).all()
+        has_more = page * per_page < total
+    result = [serialize_post(post) for post in posts]
+    if search:
+        snippets = get_search_backend().snippets(posts, search)
+        for item in result:
+            item['snippet'] = snippets.get(item['id'])
     return jsonify({
         'posts': result,
         'total': total,
+        'has_more': has_more,
         'page': page,
         'per_page': per_page,
         'categories': get_cached_categories(),
@@ -166,20 +390,46 @@ def get_posts():
 @jwt_required()
 def get_my_posts():
     user_id = get_jwt_identity()
-    posts = Post.query.filter_by(user_id=user_id).order_by(Post.created_at.desc()).all()
+    posts = with_author(Post.query.filter_by(user_id=user_id)).order_by(Post.created_at.desc()).all()
     result = []
     for post in posts:
         result.append({
             'id': post.id,
             'user_id': post.user_id,
+            'username': post.user.username if post.user else None,
             'title': post.title,
             'content': post.content,
             'media_url': get_media_url(post.media_url),
+            'media_variants': get_media_variants(post.media_url) if post.media_status == 'ready' else None,
+            'media_status': post.media_status,
+            'video': get_video_info(post) if post.media_status == 'ready' else None,
             'created_at': post.created_at,
             'updated_at': post.updated_at
         })
     return jsonify(result), 200
 
+@posts_bp.route('/api/posts/<int:post_id>/media-status', methods=['GET'])
+@jwt_required()
+def get_media_status(post_id):
+    post = visible_to(Post.query, int(get_jwt_identity())).filter(Post.id == post_id).first()
+    if not post:
+        return jsonify({'msg': 'Post not found'}), 404
+    ready = post.media_status == 'ready'
+    return jsonify({
+        'id': post.id,
+        'media_status': post.media_status,
+        'media_url': get_media_url(post.media_url),
+        'media_variants': get_media_variants(post.media_url) if ready else None,
+        'video': get_video_info(post) if ready else None
+    }), 200
+
+@posts_bp.route('/api/posts/<int:post_id>/view', methods=['POST'])
+@jwt_required()
+def record_post_view(post_id):
+    # Buffered per worker and written back in batches; no database work here
+    get_view_counter().record(post_id)
+    return '', 204
+
 @posts_bp.route('/api/posts/<int:post_id>', methods=['DELETE'])
 @jwt_required()
 def delete_post(post_id):
@@ -189,11 +439,9 @@ def delete_post(post_id):
         return jsonify({'msg': 'Post not found'}), 404
     if post.user_id != int(user_id):
         return jsonify({'msg': 'Unauthorized'}), 403
-    # Optionally delete media file
-    if post.media_url:
-        media_path = os.path.join(UPLOAD_FOLDER, post.media_url)
-        if os.path.exists(media_path):
-            os.remove(media_path)
+    # Drop the post's reference; the file is removed once nothing else uses it
+    media.release(post.media_url)
+    post.set_tags(None)
     db.session.delete(post)
     db.session.commit()
     invalidate_post_cache()
@@ -208,8 +456,10 @@ def edit_post(post_id):
         return jsonify({'msg': 'Post not found'}), 404
     if post.user_id != int(user_id):
         return jsonify({'msg': 'Unauthorized'}), 403
+    old_media_url = post.media_url
 
     # Accept both form-data (for media) and JSON
+    media.limit_upload(MAX_FILE_SIZE)
     if request.content_type and request.content_type.startswith('multipart/form-data'):
         data = request.form
     else:
@@ -228,34 +478,50 @@ def edit_post(post_id):
     if request.files and 'media' in request.files:
         file = request.files['media']
         if file and allowed_file(file.filename):
-            file.seek(0, os.SEEK_END)
-            file_length = file.tell()
-            file.seek(0)
-            if file_length > MAX_FILE_SIZE:
-                return jsonify({'msg': 'File too large (max 10MB).'}), 400
-            # Remove old media file if exists
-            if post.media_url:
-                old_media_path = os.path.join(UPLOAD_FOLDER, post.media_url)
-                if os.path.exists(old_media_path):
-                    os.remove(old_media_path)
-            filename = secure_filename(f"{user_id}_{int(time.time())}_" + file.filename)
-            file.save(os.path.join(UPLOAD_FOLDER, filename))
-            post.media_url = filename
+            try:
+                key = media.store_upload(file, MAX_FILE_SIZE)
+            except media.UnsupportedMediaType:
+                return jsonify({'msg': 'Invalid media file type.'}), 400
+            # Take the new reference before dropping the old one, in case they are the same file
+            media.acquire(key)
+            post.media_status = 'processing' if media_jobs.enqueue(key) else 'ready'
+            media.release(post.media_url)
+            post.media_url = key
         elif file.filename:
             return jsonify({'msg': 'Invalid media file type.'}), 400
+    elif data.get('upload_id'):
+        try:
+            key = resumable.claim(data['upload_id'], user_id)
+        except resumable.UploadError as e:
+            return jsonify({'msg': str(e)}), 400
+        post.media_status = 'processing' if media_jobs.enqueue(key) else 'ready'
+        media.release(post.media_url)
+        post.media_url = key
+    elif data.get('media_key'):
+        try:
+            key = media.check_direct_upload(data['media_key'], user_id, MAX_FILE_SIZE)
+        except media.UnknownUpload as e:
+            return jsonify({'msg': str(e)}), 400
+        except media.UnsupportedMediaType:
+            return jsonify({'msg': 'Invalid media file type.'}), 400
+        media.acquire(key)
+        post.media_status = 'processing' if media_jobs.enqueue(key) else 'ready'
+        media.release(post.media_url)
+        post.media_url = key
     elif data.get('remove_media'):
         # Optionally allow removing media
         if post.media_url:
-            old_media_path = os.path.join(UPLOAD_FOLDER, post.media_url)
-            if os.path.exists(old_media_path):
-                os.remove(old_media_path)
+            media.release(post.media_url)
             post.media_url = None
+            post.media_status = None
+    if post.media_url != old_media_url:
+        video.copy_known_metadata(post)
 
     post.title = title
     post.content = content
     post.category = category
     post.visibility = visibility
-    post.tags = tags
+    post.set_tags(tags)
     db.session.commit()
     invalidate_post_cache()
 
@@ -265,6 +531,7 @@ def edit_post(post_id):
         'title': post.title,
         'content': post.content,
         'media_url': get_media_url(post.media_url),
+        'media_status': post.media_status,
         'category': post.category,
         'visibility': post.visibility,
         'tags': [t.strip() for t in post.tags.split(',')] if post.tags else [],
@@ -0,0 +1,111 @@
+from flask import Blueprint, request, jsonify
+import re
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db
+from models.media import UploadSession
+from services import media, resumable
+from services.storage import get_storage
+from api.posts import allowed_file, MAX_FILE_SIZE
+
+uploads_bp = Blueprint('uploads', __name__)
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+def get_session(upload_id):
+    session = db.session.get(UploadSession, upload_id)
+    if not session or session.user_id != int(get_jwt_identity()):
+        return None
+    return session
+
+def session_status(session):
+    return {
+        'upload_id': session.id,
+        'filename': session.filename,
+        'size': session.size,
+        'offset': session.received,
+        'chunk_size': resumable.CHUNK_SIZE,
+        'status': session.status
+    }
+
+@uploads_bp.route('/api/uploads', methods=['POST'])
+@jwt_required()
+def create_upload():
+    data = request.get_json() or {}
+    filename = data.get('filename', '')
+    size = data.get('size')
+    if not allowed_file(filename):
+        return jsonify({'msg': 'Invalid media file type.'}), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({'msg': 'size must be a positive number of bytes.'}), 400
+    if size > MAX_FILE_SIZE:
+        return jsonify({'msg': 'File too large (max 10MB).'}), 413
+    session = resumable.create_session(int(get_jwt_identity()), filename, size)
+    return jsonify(session_status(session)), 201
+
+@uploads_bp.route('/api/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload(upload_id):
+    session = get_session(upload_id)
+    if not session:
+        return jsonify({'msg': 'Upload not found'}), 404
+    return jsonify(session_status(session)), 200
+
+@uploads_bp.route('/api/uploads/<upload_id>', methods=['PUT'])
+@jwt_required()
+def put_upload_chunk(upload_id):
+    session = get_session(upload_id)
+    if not session:
+        return jsonify({'msg': 'Upload not found'}), 404
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify({'msg': 'offset is required.'}), 400
+    if request.content_length is not None and request.content_length > resumable.CHUNK_SIZE:
+        return jsonify({'msg': f'Chunks must be at most {resumable.CHUNK_SIZE} bytes.'}), 413
+    data = request.stream.read(resumable.CHUNK_SIZE + 1)
+    try:
+        resumable.write_chunk(session, offset, data)
+    except resumable.UploadError as e:
+        # 409 tells the client to resume from the offset in the body
+        return jsonify({'msg': str(e), **session_status(session)}), 409
+    return jsonify(session_status(session)), 200
+
+@uploads_bp.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_upload(upload_id):
+    session = get_session(upload_id)
+    if not session:
+        return jsonify({'msg': 'Upload not found'}), 404
+    try:
+        resumable.finalize(session)
+    except resumable.UploadError as e:
+        return jsonify({'msg': str(e), **session_status(session)}), 409
+    except media.UnsupportedMediaType:
+        return jsonify({'msg': 'Invalid media file type.'}), 400
+    return jsonify(session_status(session)), 200
+
+@uploads_bp.route('/api/uploads/direct', methods=['POST'])
+@jwt_required()
+def create_direct_upload():
+    """Presign a PUT straight to object storage; the client then passes media_key to the post"""
+    storage = get_storage()
+    if not storage.direct_uploads:
+        return jsonify({'msg': 'Direct uploads need object storage; use /api/uploads instead.'}), 400
+    data = request.get_json() or {}
+    filename = data.get('filename', '')
+    size = data.get('size')
+    sha256 = str(data.get('sha256', '')).lower()
+    if not allowed_file(filename):
+        return jsonify({'msg': 'Invalid media file type.'}), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({'msg': 'size must be a positive number of bytes.'}), 400
+    if size > MAX_FILE_SIZE:
+        return jsonify({'msg': 'File too large (max 10MB).'}), 413
+    if not SHA256_RE.match(sha256):
+        return jsonify({'msg': 'sha256 must be the hex digest of the file.'}), 400
+    key = f"{sha256}.{filename.rsplit('.', 1)[1].lower()}"
+    media.record_direct_upload(int(get_jwt_identity()), filename, size, key)
+    if storage.exists(key):
+        # Same content is already stored; nothing to upload
+        return jsonify({'media_key': key, 'upload': None}), 200
+    return jsonify({'media_key': key, 'upload': storage.presign_upload(key, size, sha256)}), 200
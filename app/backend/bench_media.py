@@ -0,0 +1,159 @@
+"""Benchmark media serving through the Flask app.
+
+Runs against a throwaway database and uploads folder, so it is safe to
+run from a working checkout:
+
+    python bench_media.py [--requests N] [--size-mb M]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--requests', type=int, default=200)
+parser.add_argument('--size-mb', type=int, default=8)
+args = parser.parse_args()
+
+workdir = tempfile.mkdtemp(prefix='bench-media-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "bench.db")}'
+os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+os.makedirs(os.environ['UPLOAD_FOLDER'])
+
+from main import app  # noqa: E402  (environment must be set first)
+
+app.config['MEDIA_URL_SIGNING'] = 'off'  # measure serving itself, with plain /uploads URLs
+
+VIDEO = 'bench.mp4'
+with open(os.path.join(os.environ['UPLOAD_FOLDER'], VIDEO), 'wb') as f:
+    f.write(os.urandom(args.size_mb * 1024 * 1024))
+IMAGE_BYTES = os.urandom(200 * 1024)
+FINGERPRINTED = hashlib.sha256(IMAGE_BYTES).hexdigest() + '.jpg'
+LEGACY = '1_1700000000_photo.jpg'
+for name in (FINGERPRINTED, LEGACY):
+    with open(os.path.join(os.environ['UPLOAD_FOLDER'], name), 'wb') as f:
+        f.write(IMAGE_BYTES)
+
+
+def run(label, headers=None):
+    client = app.test_client()
+    sent = 0
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        response = client.get(f'/uploads/{VIDEO}', headers=headers or {})
+        sent += len(response.get_data())
+        response.close()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<34} {args.requests / elapsed:>9.1f} req/s {sent / elapsed / 2**20:>10.1f} MiB/s from worker'
+          f'   status={response.status_code}')
+
+
+def bench_offload():
+    print(f'Serving a {args.size_mb} MiB video, {args.requests} requests per row')
+    for mode in ('none', 'x-sendfile', 'x-accel'):
+        app.config['MEDIA_OFFLOAD'] = mode
+        run(f'{mode}: full GET')
+        run(f'{mode}: Range 1 MiB', {'Range': 'bytes=0-1048575'})
+    app.config['MEDIA_OFFLOAD'] = 'none'
+
+
+def browse(filename):
+    """Replay repeat views of one image through a minimal browser cache.
+
+    Honours max-age/immutable (no request at all) and revalidates with
+    If-None-Match otherwise. Returns requests reaching the app, bytes sent
+    and wall time.
+    """
+    client = app.test_client()
+    cached_etag = fresh_until = None
+    hits = sent = 0
+    start = time.perf_counter()
+    for view in range(args.requests):
+        now = view  # one view per simulated second
+        if fresh_until is not None and now < fresh_until:
+            continue
+        headers = {'If-None-Match': cached_etag} if cached_etag else {}
+        response = client.get(f'/uploads/{filename}', headers=headers)
+        hits += 1
+        sent += len(response.get_data())
+        cached_etag = response.headers.get('ETag', cached_etag)
+        cache_control = response.cache_control
+        if cache_control.max_age and not cache_control.no_cache:
+            fresh_until = now + cache_control.max_age
+        response.close()
+    return hits, sent, time.perf_counter() - start
+
+
+def bench_caching():
+    print(f'\n{args.requests} repeat views of a 200 KiB image through a browser cache')
+    for label, filename in (('legacy name (revalidate)', LEGACY), ('fingerprinted (immutable)', FINGERPRINTED)):
+        hits, sent, elapsed = browse(filename)
+        print(f'{label:<34} {hits:>6} requests {sent / 1024:>10.1f} KiB sent {elapsed * 1000:>9.1f} ms')
+    client = app.test_client()
+    etag = client.get(f'/uploads/{FINGERPRINTED}').headers['ETag']
+    for label, filename, headers in (('revalidation, legacy name', LEGACY, None),
+                                     ('revalidation, fingerprinted', FINGERPRINTED, {'If-None-Match': etag})):
+        if headers is None:
+            headers = {'If-None-Match': client.get(f'/uploads/{filename}').headers['ETag']}
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            response = client.get(f'/uploads/{filename}', headers=headers)
+        elapsed = time.perf_counter() - start
+        print(f'{label:<34} {args.requests / elapsed:>9.1f} req/s   status={response.status_code}')
+
+
+FEED_ACCEPTS = (
+    ('JPEG only (Accept: */*)', '*/*'),
+    ('WebP', 'image/webp,*/*;q=0.8'),
+    ('AVIF + WebP (Chrome)', 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8'),
+)
+
+
+def feed_images(count):
+    """Store count photo- and screenshot-like images with all variants; returns their keys"""
+    from PIL import Image, ImageDraw, ImageFilter
+    from services import images
+    from services.storage import get_storage, staging_path
+    keys = []
+    for i in range(count):
+        if i % 2:
+            image = Image.frombytes('RGB', (1600, 1200), os.urandom(1600 * 1200 * 3)).filter(ImageFilter.GaussianBlur(4))
+        else:
+            image = Image.new('RGB', (1440, 900), (245, 245, 245))
+            draw = ImageDraw.Draw(image)
+            for line in range(40):
+                draw.text((40, 20 + line * 21), f'{line:03d} screenshot text line for the feed benchmark ' * 2, fill=(30, 30, 30))
+        path = staging_path()
+        image.save(path, 'PNG')
+        with open(path, 'rb') as f:
+            key = hashlib.sha256(f.read()).hexdigest() + '.png'
+        get_storage().save(key, path)
+        images.generate_variants(key)
+        keys.append(key)
+    return keys
+
+
+def bench_formats(count=12):
+    print(f'\nOne feed page of {count} images (w480 variants) by Accept header')
+    with app.app_context():
+        keys = feed_images(count)
+    from services import images
+    client = app.test_client()
+    for label, accept in FEED_ACCEPTS:
+        sent = 0
+        types = set()
+        for key in keys:
+            response = client.get(f'/uploads/{images.variant_names(key)["480"]}', headers={'Accept': accept})
+            sent += len(response.get_data())
+            types.add(response.content_type)
+        print(f'{label:<34} {sent / 1024:>9.1f} KiB   {", ".join(sorted(types))}')
+
+
+try:
+    bench_offload()
+    bench_caching()
+    bench_formats()
+finally:
+    shutil.rmtree(workdir, ignore_errors=True)
@@ -13,5 +13,62 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     
+    # Posts listing: default total-count mode ('exact', 'cached' or 'none')
+    POSTS_COUNT_MODE = os.environ.get('POSTS_COUNT_MODE', 'exact')
+    POSTS_COUNT_CACHE_TTL = int(os.environ.get('POSTS_COUNT_CACHE_TTL', 30))
+    
+    # Full-text search backend: 'auto' (by database), 'sqlite', 'mysql', 'postgresql' or 'like'
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+    
+    # Shared cache: a redis:// URL makes invalidation visible to every worker
+    CACHE_URL = os.environ.get('CACHE_URL')
+    CACHE_NAMESPACE = os.environ.get('CACHE_NAMESPACE', 'prok')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 300))
+    
+    # View counting: buffered views are flushed every interval or once this many are pending
+    VIEW_FLUSH_INTERVAL = float(os.environ.get('VIEW_FLUSH_INTERVAL', 5))
+    VIEW_FLUSH_MAX_PENDING = int(os.environ.get('VIEW_FLUSH_MAX_PENDING', 1000))
+    
+    # Media worker (media_worker.py): processes, poll interval, retries and stuck-job timeout
+    MEDIA_WORKER_PROCESSES = int(os.environ.get('MEDIA_WORKER_PROCESSES', os.cpu_count() or 2))
+    MEDIA_WORKER_POLL_INTERVAL = float(os.environ.get('MEDIA_WORKER_POLL_INTERVAL', 1))
+    MEDIA_JOB_MAX_ATTEMPTS = int(os.environ.get('MEDIA_JOB_MAX_ATTEMPTS', 3))
+    MEDIA_JOB_TIMEOUT = int(os.environ.get('MEDIA_JOB_TIMEOUT', 300))
+    
+    # Hard cap on any request body (largest upload is a 10MB post plus form fields)
+    MAX_CONTENT_LENGTH = 11 * 1024 * 1024
+    
+    # Media serving offload: 'none', 'x-sendfile' or 'x-accel' (nginx internal location below)
+    MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD', 'none')
+    MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-uploads/')
+    
+    # Media storage: 'local' (uploads folder) or 's3' (any S3-compatible server, e.g. MinIO via S3_ENDPOINT_URL)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+    S3_REGION = os.environ.get('S3_REGION', 'us-east-1')
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+    S3_PREFIX = os.environ.get('S3_PREFIX', '')
+    S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')  # public bucket/CDN base; presigned GETs are used when unset
+    S3_URL_EXPIRES = int(os.environ.get('S3_URL_EXPIRES', 3600))  # presigned links are minted per window of this length
+    
+    # Signed /uploads URLs (services/media_signing.py): 'enforce', 'optional' or 'off'
+    MEDIA_URL_SIGNING = os.environ.get('MEDIA_URL_SIGNING', 'enforce')
+    MEDIA_SIGNING_KEY = os.environ.get('MEDIA_SIGNING_KEY')  # falls back to SECRET_KEY
+    MEDIA_URL_TTL = int(os.environ.get('MEDIA_URL_TTL', 6 * 3600))
+    
+    # Media origin (services/cdn.py): a CDN hostname or static host that serves /uploads instead of the API host
+    MEDIA_ORIGIN = os.environ.get('MEDIA_ORIGIN')  # e.g. https://media.example.com; this request's host when unset
+    MEDIA_URL_VERSION = int(os.environ.get('MEDIA_URL_VERSION', 1))  # bump to move every media link to a fresh path
+    # CDN purge on delete: 'none', 'fastly', 'cloudflare' or 'webhook' (POSTs {"tags": [...]} to MEDIA_PURGE_WEBHOOK)
+    MEDIA_PURGE = os.environ.get('MEDIA_PURGE', 'none')
+    MEDIA_PURGE_ZONE = os.environ.get('MEDIA_PURGE_ZONE')  # Fastly service ID or Cloudflare zone ID
+    MEDIA_PURGE_TOKEN = os.environ.get('MEDIA_PURGE_TOKEN')
+    MEDIA_PURGE_WEBHOOK = os.environ.get('MEDIA_PURGE_WEBHOOK')
+    
+    # Content-addressed media never changes under its name, so it may be cached for this long
+    MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', 365 * 24 * 3600))
+    
     # CORS
     CORS_HEADERS = 'Content-Type' 
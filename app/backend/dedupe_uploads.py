@@ -0,0 +1,35 @@
+import os
+from main import app
+from models import db
+from models.post import Post
+from models.user import User
+from models.media import MediaBlob
+from services import media
+
+BATCH_SIZE = 200
+
+# Convert legacy '<user>_<timestamp>_<name>' uploads to content-addressed blobs,
+# collapsing identical copies into one file and updating every reference.
+with app.app_context():
+    adopted = {}
+    for model, column in ((Post, Post.media_url), (User, User.avatar)):
+        last_id = 0
+        while True:
+            rows = (model.query.filter(model.id > last_id, column.isnot(None))
+                    .order_by(model.id).limit(BATCH_SIZE).all())
+            if not rows:
+                break
+            for row in rows:
+                name = getattr(row, column.key)
+                if db.session.get(MediaBlob, name):
+                    continue  # already content-addressed
+                if name not in adopted:
+                    if not os.path.exists(media.media_path(name)):
+                        print(f'Missing file, leaving reference as is: {name}')
+                        continue
+                    adopted[name] = media.adopt_legacy_file(name)
+                setattr(row, column.key, adopted[name])
+                media.acquire(adopted[name])
+            db.session.commit()
+            last_id = rows[-1].id
+    print(f'Adopted {len(adopted)} legacy files into {len(set(adopted.values()))} blobs.')
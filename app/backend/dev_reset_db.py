@@ -1,9 +1,12 @@
 from main import app
 from models import db
+from services.search import init_search
 
 with app.app_context():
     print('Dropping all tables...')
     db.drop_all()
     print('Creating all tables...')
     db.create_all()
-    print('Database reset complete.') 
\ No newline at end of file
+# The new posts table needs its search triggers, and the old index entries cleared
+init_search(app)
+print('Database reset complete.')
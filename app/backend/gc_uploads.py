@@ -0,0 +1,141 @@
+import argparse
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from main import app
+from models import db
+from models.post import Post
+from models.user import User
+from models.media import MediaBlob, UploadSession
+from services import media, cdn
+
+QUARANTINE = os.path.join(media.UPLOAD_FOLDER, '.quarantine')
+
+# Find files in uploads/ that nothing references any more (failed commits, crashed
+# requests, dev_reset_db.py, abandoned resumable uploads) and move them into
+# uploads/.quarantine/<run>/. Quarantined runs are deleted after --purge-days,
+# so a wrongly collected file can still be moved back until then.
+parser = argparse.ArgumentParser(description='Quarantine unreferenced upload files.')
+parser.add_argument('--grace-hours', type=float, default=24, help='ignore files modified more recently than this')
+parser.add_argument('--purge-days', type=float, default=7, help='delete quarantined runs older than this')
+parser.add_argument('--batch-size', type=int, default=500)
+parser.add_argument('--dry-run', action='store_true')
+args = parser.parse_args()
+
+
+def stored_files():
+    """(path, name, stat) for every file under UPLOAD_FOLDER, streamed directory by directory"""
+    pending = [media.UPLOAD_FOLDER]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path != QUARANTINE:
+                        pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.name, entry.stat(follow_symlinks=False)
+
+
+def owner_keys(name):
+    """Keys whose reference keeps this file alive: itself, or the original it was derived from"""
+    if name.startswith('.'):
+        return set()  # temp and partial uploads are only kept while recent
+    keys = {name}
+    parts = name.rsplit('.', 2)
+    if len(parts) == 3:  # <stem>.<variant>.<format>
+        keys.update(f'{parts[0]}.{ext}' for ext in media.MEDIA_FAMILIES)
+    return keys
+
+
+def referenced(keys):
+    """The subset of keys that a post, avatar or blob row still points at"""
+    found = set()
+    keys = list(keys)
+    for i in range(0, len(keys), args.batch_size):
+        chunk = keys[i:i + args.batch_size]
+        for column in (Post.media_url, User.avatar, MediaBlob.key):
+            found.update(value for (value,) in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+
+def collect(batch, run_dir, grace_cutoff):
+    keys = {path: owner_keys(name) for path, name, _ in batch}
+    alive = referenced(set().union(*keys.values()))
+    count = size = 0
+    moved = []
+    for path, name, stat in batch:
+        if keys[path] & alive:
+            continue
+        try:
+            # Re-stored by an upload since the walk (LocalStorage.save touches it); its reference may not be committed yet
+            if os.stat(path).st_mtime >= grace_cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        count += 1
+        size += stat.st_size
+        if args.dry_run:
+            print(f'Would quarantine {os.path.relpath(path, media.UPLOAD_FOLDER)}')
+            continue
+        target = os.path.join(run_dir, os.path.relpath(path, media.UPLOAD_FOLDER))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        moved.append(name)
+    # Cached copies would outlive the file; CDN purge tags cover all renditions of an upload
+    cdn.purge(moved)
+    return count, size
+
+
+def expire_upload_sessions(cutoff):
+    """Drop resumable upload sessions nobody finished or attached within the grace period"""
+    sessions = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for session in sessions:
+        if session.status == 'complete':
+            media.release(session.key)  # the reference it held until claimed
+        db.session.delete(session)
+    if not args.dry_run:
+        db.session.commit()
+    else:
+        db.session.rollback()
+    return len(sessions)
+
+
+def purge_quarantine(cutoff):
+    reclaimed = 0
+    if not os.path.isdir(QUARANTINE):
+        return reclaimed
+    for run in os.listdir(QUARANTINE):
+        run_dir = os.path.join(QUARANTINE, run)
+        if os.path.getmtime(run_dir) >= cutoff:
+            continue
+        for root, _, files in os.walk(run_dir):
+            reclaimed += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        if not args.dry_run:
+            shutil.rmtree(run_dir)
+    return reclaimed
+
+
+with app.app_context():
+    now = time.time()
+    expired = expire_upload_sessions(datetime.utcnow() - timedelta(hours=args.grace_hours))
+    run_dir = os.path.join(QUARANTINE, datetime.utcnow().strftime('%Y%m%d-%H%M%S'))
+    grace_cutoff = now - args.grace_hours * 3600
+    quarantined = quarantined_bytes = 0
+    batch = []
+    for entry in stored_files():
+        if entry[2].st_mtime >= grace_cutoff:
+            continue
+        batch.append(entry)
+        if len(batch) == args.batch_size:
+            count, size = collect(batch, run_dir, grace_cutoff)
+            quarantined, quarantined_bytes = quarantined + count, quarantined_bytes + size
+            batch = []
+    if batch:
+        count, size = collect(batch, run_dir, grace_cutoff)
+        quarantined, quarantined_bytes = quarantined + count, quarantined_bytes + size
+    reclaimed = purge_quarantine(now - args.purge_days * 86400)
+
+    print(f'Expired {expired} upload sessions.')
+    print(f'Quarantined {quarantined} files ({quarantined_bytes / 1024 / 1024:.1f}MB) into {run_dir}.')
+    print(f'Reclaimed {reclaimed / 1024 / 1024:.1f}MB from quarantine runs older than {args.purge_days:g} days.')
@@ -1,4 +1,4 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, redirect, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from config import Config
@@ -8,7 +8,6 @@ from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import os
-from flask import send_from_directory
 
 # Load environment variables
 load_dotenv()
@@ -21,6 +20,12 @@ from models.user import User
 # Create Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
+# Stream uploads straight into the media store instead of spooling them first
+from services.media import MediaRequest, UploadTooLarge
+app.request_class = MediaRequest
+# Media bytes live in the uploads folder or an S3-compatible bucket (STORAGE_BACKEND)
+from services.storage import init_storage, get_storage
+init_storage(app)
 app.config['JWT_SECRET_KEY'] = 'super-secret-key'  # Change this in production!
 
 # Initialize extensions
@@ -41,40 +46,83 @@ migrate = Migrate(app, db)
 # Register blueprints
 from api.auth import auth_bp
 from api.posts import posts_bp
+from api.uploads import uploads_bp
 # Remove or comment out the following lines if present:
 # from api.profile import profile_bp
 app.register_blueprint(auth_bp)
 app.register_blueprint(posts_bp)
+app.register_blueprint(uploads_bp)
 
-# Set UPLOAD_FOLDER to the backend's uploads directory
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Uploads live in the media store's folder (the backend's uploads directory by default)
+from services.media import media_path
+from services import images, media_jobs, media_signing, cdn
+from services.media_serving import send_media, not_modified
 
 # Create all tables for beginners (no migrations)
 with app.app_context():
     db.create_all()
 
+# Pick the full-text search backend; its indexes come from the migrations (SQLite also sets them up here)
+from services.search import init_search
+init_search(app)
+
+# Shared cache (Redis-protocol server when CACHE_URL is set, in-process otherwise)
+from services.cache import init_cache
+init_cache(app)
+
+# Buffered, periodically flushed post view counts
+from services.view_counter import init_view_counter
+init_view_counter(app)
+
 # Create a function to initialize the app
 def create_app():
     """Application factory function"""
     return app
 
-@app.route('/uploads/<filename>')
-def uploaded_file(filename):
-    """Serve uploaded files with authentication"""
+@app.errorhandler(413)
+def request_too_large(e):
+    msg = e.description if isinstance(e, UploadTooLarge) else 'Request too large.'
+    return jsonify({'msg': msg}), 413
+
+@app.route('/uploads/<filename>', defaults={'version': None})
+@app.route('/uploads/v<int:version>/<filename>')
+def uploaded_file(filename, version):
+    """Serve uploaded files to holders of a signed link"""
     # Additional security: validate filename format
     if not filename or '..' in filename or '/' in filename:
         return jsonify({'error': 'Invalid filename'}), 400
-    # Check if file exists
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
+    # With a media origin (MEDIA_ORIGIN) API hosts only see stray unversioned links; send them over for good
+    origin_url = cdn.origin_redirect() if version is None else None
+    if origin_url:
+        return redirect(origin_url, 301)
+    # Links come signed from the API (get_media_url); checking them needs no token or database
+    if not media_signing.verify_request(filename):
+        return jsonify({'error': 'Invalid or expired media link'}), 403
+    # ?size=N picks the smallest fixed-size avatar rendition covering N px
+    size = request.args.get('size', type=int)
+    if size and images.is_image(filename):
+        filename = images.avatar_for_size(filename, size)
+    # Object storage serves the bytes itself; old /uploads links are sent there
+    remote_url = get_storage().url(filename)
+    if remote_url:
+        return redirect(remote_url)
+    # Fingerprinted media never changes, so a client holding it needs no file lookup at all
+    cached = not_modified(filename)
+    if cached:
+        return cached
+    # Check if file exists; a missing rendition is queued for the media worker and the original stands in meanwhile
+    file_path = media_path(filename)
     if not os.path.exists(file_path):
-        return jsonify({'error': 'File not found'}), 404
+        original = media_jobs.request_rendition(filename)
+        if not original:
+            return jsonify({'error': 'File not found'}), 404
+        return redirect(cdn.media_url(original))
     # Allow common image and video file types
     allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.mp4', '.mov', '.avi', '.webm', '.thumb.jpg'}
     file_ext = os.path.splitext(filename.lower())[1]
     if file_ext not in allowed_extensions:
         return jsonify({'error': 'File type not allowed'}), 400
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    return send_media(filename)
 
 if __name__ == '__main__':
     # Setup database tables
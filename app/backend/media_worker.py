@@ -0,0 +1,32 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from main import app
+from services import media_jobs
+
+
+def main():
+    """Consume media_jobs: claim pending jobs, run them in a process pool, record the outcome"""
+    with app.app_context():
+        processes = app.config['MEDIA_WORKER_PROCESSES']
+        poll_interval = app.config['MEDIA_WORKER_POLL_INTERVAL']
+        print(f'Media worker started with {processes} processes.')
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            while True:
+                jobs = media_jobs.claim_jobs(limit=processes * 2)
+                if not jobs:
+                    time.sleep(poll_interval)
+                    continue
+                futures = {pool.submit(media_jobs.run_job, job.kind, job.key): job for job in jobs}
+                for future in as_completed(futures):
+                    job = futures[future]
+                    error = future.exception()
+                    if error is None:
+                        media_jobs.finish_job(job, result=future.result())
+                    else:
+                        media_jobs.finish_job(job, repr(error))
+                    print(f'Job {job.id} ({job.kind} {job.key}): {job.status}')
+
+
+# Guarded so pool processes started with 'spawn' don't run the loop again
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""Add users.profile_version and an index on posts.updated_at
+
+Revision ID: 1d6c4b8e92fa
+Revises: e5a8f3b61d29
+Create Date: 2026-10-18 13:30:48.905214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d6c4b8e92fa'
+down_revision = 'e5a8f3b61d29'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile_version', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_index('ix_posts_updated_at', 'posts', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_posts_updated_at', table_name='posts')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('profile_version')
@@ -0,0 +1,32 @@
+"""Add composite (sort column, id) indexes for keyset pagination
+
+Revision ID: 4f1a9c2e7b3d
+Revises: dc89dc7375c6
+Create Date: 2026-10-18 09:12:40.118342
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1a9c2e7b3d'
+down_revision = 'dc89dc7375c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Cursor seeks compare against the sort value, so it must never be NULL
+    op.execute('UPDATE posts SET likes_count = 0 WHERE likes_count IS NULL')
+    op.execute('UPDATE posts SET views_count = 0 WHERE views_count IS NULL')
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.create_index('ix_posts_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_posts_likes_count_id', ['likes_count', 'id'], unique=False)
+        batch_op.create_index('ix_posts_views_count_id', ['views_count', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_posts_views_count_id')
+        batch_op.drop_index('ix_posts_likes_count_id')
+        batch_op.drop_index('ix_posts_created_at_id')
@@ -0,0 +1,30 @@
+"""Add video duration and dimensions to posts
+
+Revision ID: 6d2a9f4e8c17
+Revises: 9c4e6a1f3b75
+Create Date: 2026-10-18 18:12:57.341906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2a9f4e8c17'
+down_revision = '9c4e6a1f3b75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('media_duration', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('media_width', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('media_height', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('media_height')
+        batch_op.drop_column('media_width')
+        batch_op.drop_column('media_duration')
@@ -0,0 +1,29 @@
+"""Add (filter column, sort column, id) indexes for the posts sort whitelist
+
+Revision ID: 7a9e2c5d13b8
+Revises: 1d6c4b8e92fa
+Create Date: 2026-10-18 14:18:22.076591
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7a9e2c5d13b8'
+down_revision = '1d6c4b8e92fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_posts_visibility_created_at_id', 'posts', ['visibility', 'created_at', 'id'], unique=False)
+    op.create_index('ix_posts_category_created_at_id', 'posts', ['category', 'created_at', 'id'], unique=False)
+    op.create_index('ix_posts_category_likes_count_id', 'posts', ['category', 'likes_count', 'id'], unique=False)
+    op.create_index('ix_posts_user_id_created_at_id', 'posts', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_posts_user_id_created_at_id', table_name='posts')
+    op.drop_index('ix_posts_category_likes_count_id', table_name='posts')
+    op.drop_index('ix_posts_category_created_at_id', table_name='posts')
+    op.drop_index('ix_posts_visibility_created_at_id', table_name='posts')
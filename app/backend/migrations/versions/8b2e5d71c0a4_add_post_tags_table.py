@@ -0,0 +1,57 @@
+"""Add post_tags table and backfill it from posts.tags
+
+Revision ID: 8b2e5d71c0a4
+Revises: 4f1a9c2e7b3d
+Create Date: 2026-10-18 10:03:17.502961
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e5d71c0a4'
+down_revision = '4f1a9c2e7b3d'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    post_tags = op.create_table('post_tags',
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('tag', sa.String(length=64), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id', 'tag')
+    )
+    op.create_index('ix_post_tags_tag_post_id', 'post_tags', ['tag', 'post_id'], unique=False)
+
+    # Backfill from the comma-separated column, walking posts by id in batches
+    bind = op.get_bind()
+    posts = sa.table('posts', sa.column('id', sa.Integer), sa.column('tags', sa.String))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(posts.c.id, posts.c.tags)
+            .where(posts.c.id > last_id, posts.c.tags.isnot(None))
+            .order_by(posts.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        values = []
+        for post_id, tags in rows:
+            seen = set()
+            for tag in (t.strip().lower()[:64] for t in tags.split(',')):
+                if tag and tag not in seen:
+                    seen.add(tag)
+                    values.append({'post_id': post_id, 'tag': tag})
+        if values:
+            op.bulk_insert(post_tags, values)
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    op.drop_index('ix_post_tags_tag_post_id', table_name='post_tags')
+    op.drop_table('post_tags')
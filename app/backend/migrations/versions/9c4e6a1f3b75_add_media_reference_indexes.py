@@ -0,0 +1,25 @@
+"""Add indexes on posts.media_url and users.avatar
+
+Revision ID: 9c4e6a1f3b75
+Revises: 3b7f1e9d2c60
+Create Date: 2026-10-18 17:05:12.884310
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e6a1f3b75'
+down_revision = '3b7f1e9d2c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_posts_media_url', 'posts', ['media_url'], unique=False)
+    op.create_index('ix_users_avatar', 'users', ['avatar'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_users_avatar', table_name='users')
+    op.drop_index('ix_posts_media_url', table_name='posts')
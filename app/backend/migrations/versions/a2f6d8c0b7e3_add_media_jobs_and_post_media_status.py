@@ -0,0 +1,48 @@
+"""Add media_jobs queue table and posts.media_status
+
+Revision ID: a2f6d8c0b7e3
+Revises: 5e0b7a3c9d41
+Create Date: 2026-10-18 15:47:09.283551
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2f6d8c0b7e3'
+down_revision = '5e0b7a3c9d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('media_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=80), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_media_jobs_key'), 'media_jobs', ['key'], unique=False)
+    op.create_index('ix_media_jobs_status_id', 'media_jobs', ['status', 'id'], unique=False)
+
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('media_status', sa.String(length=16), nullable=True))
+
+    # Existing media was served as-is before; treat it as ready
+    op.execute("UPDATE posts SET media_status = 'ready' WHERE media_url IS NOT NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('media_status')
+
+    op.drop_index('ix_media_jobs_status_id', table_name='media_jobs')
+    op.drop_index(op.f('ix_media_jobs_key'), table_name='media_jobs')
+    op.drop_table('media_jobs')
@@ -0,0 +1,51 @@
+"""Add full-text search index over post title and content
+
+Revision ID: c37d0e9a5f16
+Revises: 8b2e5d71c0a4
+Create Date: 2026-10-18 11:26:52.740113
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c37d0e9a5f16'
+down_revision = '8b2e5d71c0a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+                   "title, content, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+        op.execute("CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN "
+                   "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END")
+        op.execute("CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN "
+                   "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END")
+        op.execute("CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF title, content ON posts BEGIN "
+                   "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+                   "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END")
+        op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+    elif dialect == 'mysql':
+        op.execute("ALTER TABLE posts ADD FULLTEXT INDEX ft_posts_title_content (title, content)")
+    elif dialect == 'postgresql':
+        op.execute("ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+                   "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                   "setweight(to_tsvector('english', coalesce(content, '')), 'B')) STORED")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_ai")
+        op.execute("DROP TABLE IF EXISTS posts_fts")
+    elif dialect == 'mysql':
+        op.execute("ALTER TABLE posts DROP INDEX ft_posts_title_content")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_posts_search_vector")
+        op.execute("ALTER TABLE posts DROP COLUMN IF EXISTS search_vector")
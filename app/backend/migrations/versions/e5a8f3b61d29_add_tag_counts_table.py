@@ -0,0 +1,31 @@
+"""Add tag_counts table and backfill it from post_tags
+
+Revision ID: e5a8f3b61d29
+Revises: c37d0e9a5f16
+Create Date: 2026-10-18 12:41:05.331876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8f3b61d29'
+down_revision = 'c37d0e9a5f16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tag_counts',
+    sa.Column('tag', sa.String(length=64), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('tag')
+    )
+    op.create_index('ix_tag_counts_count_tag', 'tag_counts', ['count', 'tag'], unique=False)
+    op.execute('INSERT INTO tag_counts (tag, count) SELECT tag, COUNT(post_id) FROM post_tags GROUP BY tag')
+
+
+def downgrade():
+    op.drop_index('ix_tag_counts_count_tag', table_name='tag_counts')
+    op.drop_table('tag_counts')
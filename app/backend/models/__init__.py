@@ -3,4 +3,5 @@ from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 
 from .user import User
-from .post import Post 
\ No newline at end of file
+from .post import Post, PostTag, TagCount
+from .media import MediaBlob, MediaJob, UploadSession 
\ No newline at end of file
@@ -0,0 +1,61 @@
+from models import db
+from datetime import datetime
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+class MediaBlob(db.Model):
+    """One stored upload, named by its SHA-256 and shared by every post/avatar that uses it"""
+    __tablename__ = 'media_blobs'
+    key = db.Column(db.String(80), primary_key=True)  # '<sha256>.<ext>', also the filename on disk
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def add_reference(key, sha256, size):
+        """Count one more reference to key, creating its row atomically if it is new"""
+        table = MediaBlob.__table__
+        row = {'key': key, 'sha256': sha256, 'size': size, 'ref_count': 1}
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            stmt = insert(table).values(row)
+            stmt = stmt.on_conflict_do_update(index_elements=['key'], set_={'ref_count': table.c.ref_count + 1})
+        elif dialect == 'mysql':
+            stmt = mysql_insert(table).values(row)
+            stmt = stmt.on_duplicate_key_update(ref_count=table.c.ref_count + 1)
+        else:
+            stmt = table.insert().values(row)
+        db.session.execute(stmt)
+
+class MediaJob(db.Model):
+    """Deferred processing of a stored upload (see services/media_jobs.py and media_worker.py)"""
+    __tablename__ = 'media_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(80), nullable=False, index=True)  # media key the job works on
+    kind = db.Column(db.String(32), nullable=False)  # e.g. 'variants'
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UploadSession(db.Model):
+    """A resumable upload in progress (see api/uploads.py)"""
+    __tablename__ = 'upload_sessions'
+    id = db.Column(db.String(32), primary_key=True)  # random hex, also names the partial file
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # total bytes announced when the session was created
+    received = db.Column(db.Integer, nullable=False, default=0)  # contiguous bytes written so far
+    status = db.Column(db.String(16), nullable=False, default='uploading')  # uploading, complete, attached; presigned for direct uploads
+    key = db.Column(db.String(80), nullable=True)  # media key once complete
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Workers poll for the oldest pending jobs
+from sqlalchemy.schema import Index
+Index('ix_media_jobs_status_id', MediaJob.status, MediaJob.id)
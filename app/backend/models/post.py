@@ -1,6 +1,9 @@
 from models import db
 from datetime import datetime
 from sqlalchemy.dialects.mysql import VARCHAR
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 class Post(db.Model):
     __tablename__ = 'posts'
@@ -9,6 +12,11 @@ class Post(db.Model):
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
     media_url = db.Column(db.String(255), nullable=True)
+    media_status = db.Column(db.String(16), nullable=True)  # None (no media), 'processing', 'ready' or 'failed'
+    # Probed from video uploads by the media worker (services/video.py)
+    media_duration = db.Column(db.Float, nullable=True)  # seconds
+    media_width = db.Column(db.Integer, nullable=True)
+    media_height = db.Column(db.Integer, nullable=True)
     category = db.Column(db.String(64), index=True, nullable=True)
     visibility = db.Column(db.String(16), index=True, nullable=True)  # e.g., 'Public', 'Private'
     tags = db.Column(db.String(255), nullable=True)  # Comma-separated tags
@@ -18,7 +26,100 @@ class Post(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = db.relationship('User', backref=db.backref('posts', lazy=True))
+    tag_rows = db.relationship('PostTag', cascade='all, delete-orphan', lazy=True)
+
+    @staticmethod
+    def normalize_tags(tags):
+        """Split a comma-separated tags string into unique, lowercased tags"""
+        if not tags:
+            return []
+        seen = []
+        for tag in (t.strip().lower()[:64] for t in tags.split(',')):
+            if tag and tag not in seen:
+                seen.append(tag)
+        return seen
+
+    def set_tags(self, tags):
+        """Update the display string and the indexed post_tags rows together"""
+        self.tags = tags
+        wanted = self.normalize_tags(tags)
+        existing = {row.tag for row in self.tag_rows}
+        self.tag_rows = [row for row in self.tag_rows if row.tag in wanted]
+        added = [tag for tag in wanted if tag not in existing]
+        for tag in added:
+            self.tag_rows.append(PostTag(tag=tag))
+        # Popularity counters change in the same transaction as the tags themselves
+        TagCount.adjust(added, 1)
+        TagCount.adjust([tag for tag in existing if tag not in wanted], -1)
+
+class PostTag(db.Model):
+    __tablename__ = 'post_tags'
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    tag = db.Column(db.String(64), primary_key=True)
+
+class TagCount(db.Model):
+    __tablename__ = 'tag_counts'
+    tag = db.Column(db.String(64), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def adjust(tags, delta):
+        """Add delta to each tag's counter, creating missing counters atomically"""
+        if not tags:
+            return
+        table = TagCount.__table__
+        if delta < 0:
+            db.session.execute(table.update().where(table.c.tag.in_(tags)).values(count=table.c.count + delta))
+            return
+        rows = [{'tag': tag, 'count': delta} for tag in tags]
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            stmt = insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(index_elements=['tag'], set_={'count': table.c.count + delta})
+        elif dialect == 'mysql':
+            stmt = mysql_insert(table).values(rows)
+            stmt = stmt.on_duplicate_key_update(count=table.c.count + delta)
+        else:
+            for tag in tags:
+                if not db.session.execute(table.update().where(table.c.tag == tag)
+                                          .values(count=table.c.count + delta)).rowcount:
+                    db.session.execute(table.insert().values(tag=tag, count=delta))
+            return
+        db.session.execute(stmt)
+
+    @staticmethod
+    def rebuild():
+        """Recompute every counter from post_tags (repair tool; see rebuild_tag_counts.py)"""
+        db.session.execute(TagCount.__table__.delete())
+        db.session.execute(TagCount.__table__.insert().from_select(
+            ['tag', 'count'],
+            db.select(PostTag.tag, db.func.count(PostTag.post_id)).group_by(PostTag.tag)))
 
 # Add index with key length for MySQL
 from sqlalchemy.schema import Index
 Index('ix_posts_content', Post.content, mysql_length=255)
+
+# Composite (sort column, id) indexes backing keyset pagination in get_posts
+Index('ix_posts_created_at_id', Post.created_at, Post.id)
+Index('ix_posts_likes_count_id', Post.likes_count, Post.id)
+Index('ix_posts_views_count_id', Post.views_count, Post.id)
+
+# (filter column, sort column, id) indexes for the common filtered listings;
+# other filter/sort pairs sort the rows matching the filter
+Index('ix_posts_visibility_created_at_id', Post.visibility, Post.created_at, Post.id)
+Index('ix_posts_category_created_at_id', Post.category, Post.created_at, Post.id)
+Index('ix_posts_category_likes_count_id', Post.category, Post.likes_count, Post.id)
+Index('ix_posts_user_id_created_at_id', Post.user_id, Post.created_at, Post.id)
+
+# max(updated_at) is the listing version stamp for conditional GETs
+Index('ix_posts_updated_at', Post.updated_at)
+
+# Tag filters look up post ids by tag
+Index('ix_post_tags_tag_post_id', PostTag.tag, PostTag.post_id)
+
+# Popular tags are a top-N scan of this index
+Index('ix_tag_counts_count_tag', TagCount.count, TagCount.tag)
+
+# The media GC (gc_uploads.py) checks which stored files are still referenced
+Index('ix_posts_media_url', Post.media_url)
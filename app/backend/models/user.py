@@ -24,6 +24,10 @@ class User(db.Model):
     github = db.Column(db.String(256))
     twitter = db.Column(db.String(256))
     avatar = db.Column(db.String(256))  # Image filename or URL
+    profile_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # ETag for GET /api/profile
+
+    def bump_profile_version(self):
+        self.profile_version = User.profile_version + 1
 
     def set_password(self, password):
         if not self.is_password_complex(password):
@@ -88,3 +92,8 @@ class User(db.Model):
             raise ValueError('Avatar must be at most 256 characters.')
         # Do not require avatar to be a URL; allow plain filenames
         return value
+
+
+# The media GC (gc_uploads.py) checks which stored files are still referenced
+from sqlalchemy.schema import Index
+Index('ix_users_avatar', User.avatar)
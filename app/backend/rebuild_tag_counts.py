@@ -0,0 +1,11 @@
+from main import app
+from models import db
+from models.post import TagCount
+from services.cache import get_cache
+
+with app.app_context():
+    print('Rebuilding tag counts from post_tags...')
+    TagCount.rebuild()
+    db.session.commit()
+    get_cache().invalidate('posts')
+    print(f'Tag counts rebuilt ({TagCount.query.count()} tags).')
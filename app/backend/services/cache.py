@@ -0,0 +1,154 @@
+"""Versioned cache shared by all workers.
+
+Entries live under a per-scope generation number. Invalidating a scope
+just increments its generation, so every worker talking to the same
+backend stops seeing the old entries at once; they then expire by TTL.
+A short-lived lock key makes sure only one worker recomputes a missing
+entry while the others wait for it.
+"""
+import json
+import threading
+import time
+from flask import current_app
+
+LOCK_TTL = 10  # seconds a recompute lock may be held
+LOCK_WAIT = 0.05  # seconds between polls while another worker recomputes
+
+
+class MemoryCacheBackend:
+    """Process-local backend; only coherent within a single worker"""
+    max_entries = 10000
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item and (item[1] is None or item[1] > now):
+            return item
+        self._data.pop(key, None)
+        return None
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key, time.monotonic())
+            return item[0] if item else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                now = time.monotonic()
+                for k in [k for k, v in self._data.items() if v[1] is not None and v[1] <= now]:
+                    del self._data[k]
+                if len(self._data) >= self.max_entries:
+                    self._data.clear()
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        """Set key only if it is absent; returns True when this call set it"""
+        with self._lock:
+            if self._live(key, time.monotonic()):
+                return False
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            item = self._live(key, time.monotonic())
+            value = (item[0] if item else 0) + 1
+            self._data[key] = (value, None)
+            return value
+
+
+class RedisCacheBackend:
+    """Backend for any Redis-protocol server, shared by every worker"""
+
+    def __init__(self, url):
+        import redis  # optional dependency, only needed when CACHE_URL is set
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, json.dumps(value), ex=ttl)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, json.dumps(value), ex=ttl, nx=True))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+class VersionedCache:
+    def __init__(self, backend, namespace='prok', default_ttl=300):
+        self.backend = backend
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+
+    def generation(self, scope):
+        return self.backend.get(f'{self.namespace}:gen:{scope}') or 0
+
+    def invalidate(self, scope):
+        """Drop every entry in a scope for all workers by bumping its generation"""
+        return self.backend.incr(f'{self.namespace}:gen:{scope}')
+
+    def get_or_compute(self, scope, key, compute, ttl=None):
+        ttl = ttl or self.default_ttl
+        try:
+            full_key = f'{self.namespace}:{scope}:{self.generation(scope)}:{key}'
+            value = self.backend.get(full_key)
+            if value is not None:
+                return value['v']
+            lock_key = f'{full_key}:lock'
+            deadline = time.monotonic() + LOCK_TTL
+            locked = self.backend.add(lock_key, 1, LOCK_TTL)
+            while not locked:
+                # Another worker is computing this entry; wait for its result
+                time.sleep(LOCK_WAIT)
+                value = self.backend.get(full_key)
+                if value is not None:
+                    return value['v']
+                if time.monotonic() > deadline:
+                    break
+                locked = self.backend.add(lock_key, 1, LOCK_TTL)
+        except Exception as e:
+            current_app.logger.warning(f'Cache unavailable ({e}); computing {scope}:{key} directly')
+            return compute()
+        try:
+            result = compute()
+            try:
+                # Wrapped so cached falsy results ([] or 0) are distinguishable from misses
+                self.backend.set(full_key, {'v': result}, ttl)
+            except Exception as e:
+                current_app.logger.warning(f'Cache unavailable ({e}); not storing {scope}:{key}')
+        finally:
+            # Released even when compute() fails, so waiters retry at once instead of after LOCK_TTL
+            if locked:
+                try:
+                    self.backend.delete(lock_key)
+                except Exception as e:
+                    current_app.logger.warning(f'Cache unavailable ({e}); lock on {scope}:{key} expires by TTL')
+        return result
+
+
+def init_cache(app):
+    """Attach the shared cache configured by CACHE_URL (in-process when unset)"""
+    url = app.config.get('CACHE_URL')
+    backend = RedisCacheBackend(url) if url else MemoryCacheBackend()
+    cache = VersionedCache(backend, app.config.get('CACHE_NAMESPACE', 'prok'), app.config.get('CACHE_DEFAULT_TTL', 300))
+    app.extensions['cache'] = cache
+    return cache
+
+
+def get_cache():
+    return current_app.extensions['cache']
@@ -0,0 +1,101 @@
+"""Media links and the CDN in front of them.
+
+Links have the form ``<base>/uploads/v<MEDIA_URL_VERSION>/<filename>`` plus
+the signature from services/media_signing.py. The base is MEDIA_ORIGIN (a
+CDN hostname, or a static host running this app with MEDIA_OFFLOAD) and
+otherwise this request's host; it is worked out once per request, so each
+link costs a string join and an HMAC rather than a url_for() call.
+
+Bumping MEDIA_URL_VERSION moves every link to a new path, so clients and
+caches fetch media afresh (e.g. after renditions are regenerated with new
+encoder settings) without purging anything. Old versions are still served.
+
+Responses are tagged with the content hash of the upload they were derived
+from (Surrogate-Key for Fastly, Cache-Tag for Cloudflare), and deleting an
+upload purges that tag: every rendition, encoding, version and signature
+of it leaves the CDN with one request. MEDIA_PURGE selects the API.
+"""
+import json
+import urllib.request
+from urllib.parse import quote, urlencode
+from flask import current_app, g, request
+from services import media_signing
+from services.storage import get_storage
+
+PURGE_TIMEOUT = 5  # seconds; a failed purge only leaves copies until max-age runs out
+PURGE_BATCH = 30  # Cloudflare's limit on tags per purge request
+
+
+def media_base():
+    """Everything in a media link before the filename"""
+    base = g.get('media_base')
+    if base is None:
+        origin = current_app.config['MEDIA_ORIGIN'] or request.url_root
+        base = g.media_base = f'{origin.rstrip("/")}/uploads/v{current_app.config["MEDIA_URL_VERSION"]}/'
+    return base
+
+
+def media_url(filename):
+    """Signed link to a file in local storage"""
+    url = media_base() + quote(filename)
+    params = media_signing.signed_params(filename)
+    return f'{url}?{urlencode(params)}' if params else url
+
+
+def link_version():
+    """Changes whenever media links do; part of the ETags of responses that embed them"""
+    return f'{media_signing.url_window()}:{current_app.config["MEDIA_URL_VERSION"]}:{get_storage().url_version()}'
+
+
+def cache_tag(filename):
+    """Purge key of a stored file: the content hash (or legacy stem) it was derived from"""
+    return filename.split('.', 1)[0]
+
+
+def tag_response(response, filename):
+    tag = cache_tag(filename)
+    response.headers['Surrogate-Key'] = tag
+    response.headers['Cache-Tag'] = tag
+    return response
+
+
+def origin_redirect():
+    """Where an unversioned /uploads request should go once media has its own origin, or None"""
+    if not current_app.config['MEDIA_ORIGIN']:
+        return None
+    url = media_base() + quote(request.view_args['filename'])
+    return f'{url}?{request.query_string.decode()}' if request.query_string else url
+
+
+def _purge_request(mode, tags):
+    config = current_app.config
+    token = config['MEDIA_PURGE_TOKEN']
+    if mode == 'fastly':
+        return urllib.request.Request(
+            f'https://api.fastly.com/service/{config["MEDIA_PURGE_ZONE"]}/purge', method='POST',
+            headers={'Fastly-Key': token, 'Surrogate-Key': ' '.join(tags)})
+    if mode == 'cloudflare':
+        return urllib.request.Request(
+            f'https://api.cloudflare.com/client/v4/zones/{config["MEDIA_PURGE_ZONE"]}/purge_cache', method='POST',
+            data=json.dumps({'tags': tags}).encode(),
+            headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'})
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    return urllib.request.Request(config['MEDIA_PURGE_WEBHOOK'], method='POST',
+                                  data=json.dumps({'tags': tags}).encode(), headers=headers)
+
+
+def purge(keys):
+    """Evict deleted media (and everything derived from it) from the CDN; failures are only logged"""
+    mode = current_app.config['MEDIA_PURGE']
+    tags = sorted({cache_tag(key) for key in keys})
+    if mode == 'none' or not tags:
+        return
+    for start in range(0, len(tags), PURGE_BATCH):
+        batch = tags[start:start + PURGE_BATCH]
+        try:
+            with urllib.request.urlopen(_purge_request(mode, batch), timeout=PURGE_TIMEOUT):
+                pass
+        except Exception as e:
+            current_app.logger.warning(f'CDN purge of {", ".join(batch)} failed ({e})')
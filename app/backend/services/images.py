@@ -0,0 +1,241 @@
+"""Responsive image variants.
+
+Every stored image gets fixed-width JPEG renditions and a square
+thumbnail next to the original, named after the original's stem:
+``<stem>.w160.jpg``, ``<stem>.w480.jpg``, ``<stem>.w1080.jpg`` and
+``<stem>.thumb.jpg``. Names are derived from the key alone, so listings
+can build variant URLs without touching the disk.
+
+Each JPEG variant, and the full-size original (``<stem>.full.<fmt>``),
+is also pre-encoded as WebP and, where Pillow has libavif, AVIF. Listings
+keep linking the JPEG names; /uploads swaps in the smallest encoding the
+client's Accept header allows (see media_serving.send_media).
+
+Avatars additionally get square, center-cropped renditions in fixed sizes
+(``<stem>.a40.jpg`` ...), queued for the media worker when the avatar is
+uploaded.
+"""
+import io
+import mimetypes
+import os
+import re
+from PIL import Image, ImageOps, features
+from services.storage import get_storage, staging_path
+
+try:
+    from PIL import ImageCms
+    SRGB_PROFILE = ImageCms.createProfile('sRGB')
+except ImportError:  # Pillow built without LittleCMS: embedded profiles are dropped unconverted
+    ImageCms = None
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+VARIANT_WIDTHS = (160, 480, 1080)
+THUMB_SIZE = (320, 320)
+AVATAR_SIZES = (40, 80, 160, 320)
+JPEG_QUALITY = 82
+
+# extension -> (Pillow format, MIME type, encoder options). Qualities are picked
+# to look like the JPEG variants at a fraction of the size; slower encoder
+# settings are fine because encoding happens once, in the media worker.
+ENCODINGS = {
+    'jpg': ('JPEG', 'image/jpeg', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'image/webp', {'quality': 78, 'method': 6}),
+    'avif': ('AVIF', 'image/avif', {'quality': 50, 'speed': 6}),
+}
+# Negotiated encodings, preferred first; AVIF only when this Pillow can write it
+ALTERNATE_FORMATS = tuple(fmt for fmt in ('avif', 'webp') if features.check(fmt))
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+
+# JPEG renditions: widths, thumbnail, avatar squares and video posters (services/video.py)
+VARIANT_RE = re.compile(r'^(?P<stem>.+)\.(?P<variant>w\d+|a\d+|thumb|poster)\.jpg$')
+
+
+def is_image(key):
+    return bool(key) and '.' in key and key.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def variant_names(key):
+    """Map variant name ('160', '480', '1080', 'thumb') to its filename"""
+    stem = key.rsplit('.', 1)[0]
+    names = {str(w): f'{stem}.w{w}.jpg' for w in VARIANT_WIDTHS}
+    names['thumb'] = f'{stem}.thumb.jpg'
+    return names
+
+
+def avatar_names(key):
+    """Map avatar size (in px) to its rendition filename"""
+    stem = key.rsplit('.', 1)[0]
+    return {size: f'{stem}.a{size}.jpg' for size in AVATAR_SIZES}
+
+
+def avatar_for_size(key, size):
+    """The smallest avatar rendition at least size px wide (the largest if none is)"""
+    fitting = next((s for s in AVATAR_SIZES if s >= size), AVATAR_SIZES[-1])
+    return avatar_names(key)[fitting]
+
+
+def alternate_name(filename, fmt):
+    """Name of the fmt encoding of a JPEG variant or an original, or None if it has none"""
+    match = VARIANT_RE.match(filename)
+    if match:
+        return f'{match.group("stem")}.{match.group("variant")}.{fmt}'
+    # Animated GIFs would lose their animation, so only their stills get re-encoded
+    if is_image(filename) and not filename.lower().endswith('.gif'):
+        return f'{filename.rsplit(".", 1)[0]}.full.{fmt}'
+    return None
+
+
+def has_alternates(filename):
+    """Whether requests for filename are negotiated between encodings"""
+    return bool(ALTERNATE_FORMATS) and alternate_name(filename, ALTERNATE_FORMATS[0]) is not None
+
+
+def _explicitly_accepts(accept, mimetype):
+    # Browsers list formats they decode; */* and image/* don't promise WebP or AVIF support
+    return any(value == mimetype and quality > 0 for value, quality in accept)
+
+
+def negotiate(filename, accept):
+    """Names that could answer a request for filename, best first; the last is filename itself"""
+    names = [alternate_name(filename, fmt) for fmt in ALTERNATE_FORMATS
+             if _explicitly_accepts(accept, ENCODINGS[fmt][1])]
+    return [name for name in names if name] + [filename]
+
+
+def _renditions(key):
+    """(render spec, filenames) for everything generate_variants produces from key"""
+    renditions = []
+    for variant, name in variant_names(key).items():
+        spec = 'thumb' if variant == 'thumb' else f'w{variant}'
+        renditions.append((spec, [name] + [alternate_name(name, fmt) for fmt in ALTERNATE_FORMATS]))
+    full = [alternate_name(key, fmt) for fmt in ALTERNATE_FORMATS]
+    if full and full[0]:
+        renditions.append(('full', full))
+    return renditions
+
+
+def variants_ready(key):
+    storage = get_storage()
+    return all(storage.exists(name) for _, names in _renditions(key) for name in names)
+
+
+def _open_image(key):
+    """The original, upright: RGBA if it has transparency (WebP and AVIF keep it), RGB otherwise"""
+    with get_storage().local_copy(key) as path:
+        image = Image.open(path)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    mode = 'RGBA' if has_alpha else 'RGB'
+    icc = image.info.pop('icc_profile', None)
+    image = _to_srgb(image, icc, mode) if icc and ImageCms is not None else image.convert(mode)
+    # Derived files carry no EXIF (GPS, camera), XMP or ICC metadata; colours were converted to sRGB above
+    image.info = {}
+    return image
+
+
+def _to_srgb(image, icc, mode):
+    """Apply an embedded ICC profile (Display P3 from phones, Adobe RGB, CMYK...) so pixels are sRGB"""
+    if image.mode not in (mode, 'CMYK'):
+        image = image.convert(mode)
+    try:
+        return ImageCms.profileToProfile(image, ImageCms.ImageCmsProfile(io.BytesIO(icc)), SRGB_PROFILE,
+                                         outputMode=mode)
+    except (ImageCms.PyCMSError, OSError, ValueError):
+        return image.convert(mode)  # unreadable profile: keep the values as they are
+
+
+def _flatten(image):
+    """Put transparency onto white for JPEG, so PNG/GIF variants don't turn black"""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.split()[-1])
+    return background
+
+
+def _render(image, variant):
+    if variant == 'full':
+        return image
+    if variant.startswith('a'):
+        size = int(variant[1:])
+        return ImageOps.fit(image, (size, size), Image.LANCZOS)
+    if variant == 'thumb':
+        return ImageOps.fit(image, THUMB_SIZE, Image.LANCZOS)
+    width = int(variant[1:])
+    if image.width <= width:
+        return image  # never upscale; the variant is just a re-encode
+    return image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+
+def save_rendition(image, filename):
+    """Encode image in the format named by filename's extension and store it"""
+    pillow_format, _, options = ENCODINGS[filename.rsplit('.', 1)[1]]
+    if pillow_format == 'JPEG':
+        image = _flatten(image)
+    # Unique per writer: several worker processes may render the same file at once
+    tmp_path = staging_path()
+    try:
+        image.save(tmp_path, pillow_format, **options)
+        get_storage().save(filename, tmp_path)  # if another writer got there first, its copy is kept
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def generate_variants(key):
+    """Write any missing variants of an image; returns the filenames written"""
+    storage = get_storage()
+    if not is_image(key) or not storage.exists(key):
+        return []
+    image = None
+    written = []
+    for spec, names in _renditions(key):
+        missing = [name for name in names if not storage.exists(name)]
+        if not missing:
+            continue
+        image = image or _open_image(key)
+        rendered = _render(image, spec)
+        for name in missing:
+            save_rendition(rendered, name)
+        written.extend(missing)
+    return written
+
+
+def generate_avatar_renditions(key):
+    """Write the fixed-size avatar squares (and their WebP/AVIF encodings) for an uploaded avatar"""
+    storage = get_storage()
+    image = None
+    for size, name in avatar_names(key).items():
+        names = [name] + [alternate_name(name, fmt) for fmt in ALTERNATE_FORMATS]
+        missing = [n for n in names if not storage.exists(n)]
+        if not missing:
+            continue
+        image = image or _open_image(key)
+        rendered = _render(image, f'a{size}')
+        for n in missing:
+            save_rendition(rendered, n)
+
+
+def avatars_ready(key):
+    storage = get_storage()
+    return all(storage.exists(n) for name in avatar_names(key).values()
+               for n in [name] + [alternate_name(name, fmt) for fmt in ALTERNATE_FORMATS])
+
+
+def original_for(filename):
+    """The stored original a missing JPEG rendition is rendered from, or None if it can't be"""
+    match = VARIANT_RE.match(filename)
+    if not match:
+        return None
+    variant = match.group('variant')
+    if variant == 'poster':
+        return None  # only the video job can produce posters
+    if variant.startswith('w') and int(variant[1:]) not in VARIANT_WIDTHS:
+        return None
+    if variant.startswith('a') and int(variant[1:]) not in AVATAR_SIZES:
+        return None
+    storage = get_storage()
+    return next((f'{match.group("stem")}.{ext}' for ext in sorted(IMAGE_EXTENSIONS)
+                 if storage.exists(f'{match.group("stem")}.{ext}')), None)
@@ -0,0 +1,300 @@
+"""Content-addressed media storage.
+
+Uploads are parsed straight into the uploads folder (see MediaRequest),
+size-limited and hashed as the bytes arrive, and stored once as
+``<sha256>.<ext>``. Post.media_url and User.avatar hold that key, and
+media_blobs.ref_count tracks how many of them do. A blob's file is
+removed only after the transaction that drops its last reference commits.
+Files from before this scheme (``<user>_<timestamp>_<name>``) have no
+blob row and keep their old single-owner behaviour.
+
+Where stored files end up (sharded local folder or object storage) is up
+to the backend in services/storage.py.
+"""
+import hashlib
+import mimetypes
+import os
+import uuid
+from flask import Request, request
+from sqlalchemy import event
+from werkzeug.exceptions import RequestEntityTooLarge
+from models import db
+from models.media import MediaBlob, UploadSession
+from services.storage import (HEX_STEM_RE, UPLOAD_FOLDER, get_storage, media_path, relative_media_path, shard_dir,  # noqa: F401
+                              sharded_path, staging_path)
+from services import cdn
+
+try:
+    import magic
+except ImportError:  # libmagic not installed: fall back to the filename extension
+    magic = None
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 4096  # enough for libmagic to identify image and video containers
+FORM_OVERHEAD = 64 * 1024  # room for the text fields and multipart headers around a file
+MEDIA_FAMILIES = {
+    'png': 'image', 'jpg': 'image', 'jpeg': 'image', 'gif': 'image',
+    'mp4': 'video', 'mov': 'video', 'avi': 'video', 'webm': 'video',
+}
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    def __init__(self, max_size):
+        super().__init__(f'File too large (max {max_size // (1024 * 1024)}MB).')
+
+
+class UnsupportedMediaType(ValueError):
+    pass
+
+
+class UnknownUpload(ValueError):
+    pass
+
+
+def sniff_mime(head, filename):
+    if magic is not None:
+        return magic.from_buffer(head, mime=True)
+    return mimetypes.guess_type(filename or '')[0] or 'application/octet-stream'
+
+
+class IncomingUpload:
+    """Writable file Werkzeug parses an uploaded part into.
+
+    Lives in the uploads folder so keeping it is a rename, hashes and
+    counts every write, keeps the first bytes for MIME sniffing, and
+    raises UploadTooLarge the moment the limit is crossed.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.tmp_path = staging_path()
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+        self.stored = False
+        self._file = open(self.tmp_path, 'w+b')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.close()
+            raise UploadTooLarge(self.max_size)
+        if len(self.head) < SNIFF_BYTES:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+        self.digest.update(data)
+        return self._file.write(data)
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def store_as(self, key):
+        """Hand the finished upload to the storage backend (a rename for local storage)"""
+        self._file.close()
+        get_storage().save(key, self.tmp_path)
+        self.stored = True
+
+    def close(self):
+        self._file.close()
+        # Parts that were never stored (rejected or abandoned requests) leave nothing behind
+        if not self.stored and os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class MediaRequest(Request):
+    """Request class that streams file parts into IncomingUpload once a view sets a limit"""
+    upload_limit = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.upload_limit is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return IncomingUpload(self.upload_limit)
+
+
+def limit_upload(max_size):
+    """Set this request's upload limit; call before touching request.form or request.files.
+
+    Bodies whose declared length is already over the limit are refused
+    before a single byte is read; others are cut off while streaming.
+    """
+    if request.content_length is not None and request.content_length > max_size + FORM_OVERHEAD:
+        raise UploadTooLarge(max_size)
+    request.upload_limit = max_size
+
+
+def store_upload(file, max_size):
+    """Keep an uploaded file under its content key and return the key.
+
+    Files parsed by MediaRequest are already on disk and hashed, so this is
+    a rename; anything else is copied through IncomingUpload once. Raises
+    UploadTooLarge past max_size and UnsupportedMediaType when the sniffed
+    MIME type does not match the file extension. The returned key is not
+    referenced yet; pass it to acquire().
+    """
+    ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'bin'
+    upload = file.stream
+    if not isinstance(upload, IncomingUpload):
+        upload = IncomingUpload(max_size)
+        try:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                upload.write(chunk)
+        except BaseException:
+            upload.close()
+            raise
+    mime = sniff_mime(upload.head, file.filename)
+    if mime.split('/')[0] != MEDIA_FAMILIES.get(ext):
+        upload.close()
+        raise UnsupportedMediaType(f'File content ({mime}) does not match .{ext}')
+    key = f'{upload.digest.hexdigest()}.{ext}'
+    upload.store_as(key)
+    upload.close()
+    db.session.info.setdefault('media_sizes', {})[key] = (upload.digest.hexdigest(), upload.size)
+    return key
+
+
+def acquire(key):
+    """Record one more reference to a stored blob (in the current transaction)"""
+    db.session.flush()  # apply release()s from earlier in this transaction first
+    table = MediaBlob.__table__
+    incremented = db.session.execute(table.update().where(table.c.key == key)
+                                     .values(ref_count=table.c.ref_count + 1)).rowcount
+    if not incremented:
+        # New content; a concurrent upload of the same file may be inserting it too
+        sha256, size = db.session.info.get('media_sizes', {}).get(key) or (key.split('.', 1)[0], get_storage().size(key))
+        MediaBlob.add_reference(key, sha256, size)
+    loaded = db.session.identity_map.get(db.session.identity_key(MediaBlob, key))
+    if loaded is not None:
+        db.session.expire(loaded)
+    # Don't let a pending delete from earlier in this transaction remove the file
+    db.session.info.get('media_orphans', set()).discard(key)
+
+
+def release(key):
+    """Drop one reference; the file goes once the last reference is committed away"""
+    if not key:
+        return
+    blob = db.session.get(MediaBlob, key, with_for_update=True)
+    if blob is not None:
+        blob.ref_count = (blob.ref_count or 0) - 1
+        if blob.ref_count > 0:
+            return
+        db.session.delete(blob)
+    # Legacy uploads have no blob row and belong to exactly one post or avatar
+    db.session.info.setdefault('media_orphans', set()).add(key)
+
+
+def store_assembled(path, filename):
+    """Keep a file already assembled in the uploads folder under its content key.
+
+    Used for resumable uploads: the file is hashed with one streaming pass
+    and renamed, never loaded into memory or copied.
+    """
+    ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'bin'
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+        f.seek(0)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    mime = sniff_mime(head, filename)
+    if mime.split('/')[0] != MEDIA_FAMILIES.get(ext):
+        raise UnsupportedMediaType(f'File content ({mime}) does not match .{ext}')
+    key = f'{digest.hexdigest()}.{ext}'
+    get_storage().save(key, path)
+    db.session.info.setdefault('media_sizes', {})[key] = (digest.hexdigest(), size)
+    return key
+
+
+def record_direct_upload(user_id, filename, size, key):
+    """Remember that user_id was handed an upload URL for key; only they may attach it"""
+    db.session.add(UploadSession(id=uuid.uuid4().hex, user_id=user_id, filename=filename, size=size,
+                                 received=0, status='presigned', key=key))
+    db.session.commit()
+
+
+def check_direct_upload(key, user_id, max_size):
+    """Validate a file a client put straight into object storage; returns the key.
+
+    Only keys this user presigned (POST /api/uploads/direct) are accepted,
+    so a key seen in someone else's media link can't be attached. The key
+    is the content hash the client declared when the upload was presigned
+    (and the storage checked the body against it), so only size and content
+    type are left to verify. Rejected files are removed unless another post
+    or avatar already uses the same content.
+    """
+    storage = get_storage()
+    if not storage.direct_uploads:
+        raise UnknownUpload('Direct uploads are not enabled; use /api/uploads instead.')
+    presigned = UploadSession.query.filter_by(user_id=int(user_id), key=key, status='presigned').first()
+    if presigned is None:
+        raise UnknownUpload('Upload not found.')
+    stem, _, ext = key.partition('.')
+    if len(stem) != 64 or not HEX_STEM_RE.match(stem) or ext not in MEDIA_FAMILIES:
+        raise UnsupportedMediaType('Not a media key')
+    if not storage.exists(key):
+        raise UnsupportedMediaType('Upload not found')
+    size = storage.size(key)
+    try:
+        if size > max_size:
+            raise UploadTooLarge(max_size)
+        mime = sniff_mime(storage.read_head(key, SNIFF_BYTES), key)
+        if mime.split('/')[0] != MEDIA_FAMILIES[ext]:
+            raise UnsupportedMediaType(f'File content ({mime}) does not match .{ext}')
+    except (UploadTooLarge, UnsupportedMediaType):
+        discard_unreferenced(key)
+        raise
+    presigned.status = 'attached'
+    db.session.info.setdefault('media_sizes', {})[key] = (stem, size)
+    return key
+
+
+def adopt_legacy_file(filename):
+    """Move a pre-content-addressing upload to its content key; returns the key"""
+    path = media_path(filename)
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'bin'
+    key = f'{digest.hexdigest()}.{ext}'
+    get_storage().save(key, path)
+    db.session.info.setdefault('media_sizes', {})[key] = (digest.hexdigest(), size)
+    return key
+
+
+def discard_unreferenced(key):
+    """Remove a freshly stored file again if nothing ended up referencing it"""
+    if not db.session.get(MediaBlob, key):
+        get_storage().delete(key)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _remove_orphaned_files(session):
+    orphans = session.info.pop('media_orphans', set())
+    session.info.pop('media_sizes', None)
+    deleted = []
+    for key in orphans:
+        # A concurrent upload may have re-acquired the same content meanwhile
+        with db.engine.connect() as connection:
+            if connection.execute(db.select(MediaBlob.key).where(MediaBlob.key == key)).first():
+                continue
+        storage = get_storage()
+        for name in [key] + storage.derived_keys(key):
+            storage.delete(name)
+        deleted.append(key)
+    cdn.purge(deleted)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_orphaned_files(session):
+    session.info.pop('media_orphans', None)
+    session.info.pop('media_sizes', None)
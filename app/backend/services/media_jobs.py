@@ -0,0 +1,117 @@
+"""Database-backed queue for media processing.
+
+Requests only store the original upload and enqueue a job in the same
+transaction; media_worker.py claims jobs and runs the heavy work in a
+ProcessPoolExecutor. Posts track progress in Post.media_status.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from models import db
+from models.media import MediaJob
+from models.post import Post
+from services import images, video
+
+JOB_KINDS = ('variants', 'avatars', 'video')
+
+
+def jobs_for(key, avatar=False):
+    """Job kinds an upload needs before all of its derived assets exist"""
+    kinds = []
+    if images.is_image(key):
+        if not images.variants_ready(key):
+            kinds.append('variants')
+        if avatar and not images.avatars_ready(key):
+            kinds.append('avatars')
+    elif video.is_video(key) and not video.poster_ready(key):
+        kinds.append('video')
+    return kinds
+
+
+def enqueue(key, avatar=False):
+    """Queue processing for a freshly stored upload; returns True if any work is pending.
+
+    avatar=True also queues the fixed-size avatar squares.
+    """
+    kinds = jobs_for(key, avatar)
+    for kind in kinds:
+        already_queued = MediaJob.query.filter(MediaJob.key == key, MediaJob.kind == kind,
+                                               MediaJob.status.in_(('pending', 'running'))).first()
+        if not already_queued:
+            db.session.add(MediaJob(key=key, kind=kind, status='pending'))
+    return bool(kinds)
+
+
+def request_rendition(filename):
+    """Queue a rendition that was asked for before it exists; returns the original standing in for it.
+
+    Older uploads predate some renditions, and avatars get theirs from the
+    worker; requests never render them inline.
+    """
+    original = images.original_for(filename)
+    if original is None:
+        return None
+    enqueue(original, avatar=images.VARIANT_RE.match(filename).group('variant').startswith('a'))
+    db.session.commit()
+    return original
+
+
+def run_job(kind, key):
+    """Executed in a worker process; must only touch files, never the database.
+
+    Returns data for finish_job to record (video metadata), or None.
+    """
+    if kind == 'variants':
+        images.generate_variants(key)
+    elif kind == 'avatars':
+        images.generate_avatar_renditions(key)
+    elif kind == 'video':
+        return video.probe(key)
+    else:
+        raise ValueError(f'Unknown media job kind: {kind}')
+
+
+def claim_jobs(limit):
+    """Atomically move up to limit pending jobs to running and return them"""
+    timeout = timedelta(seconds=current_app.config['MEDIA_JOB_TIMEOUT'])
+    # Jobs whose worker died mid-run go back to the queue
+    db.session.execute(update(MediaJob)
+                       .where(MediaJob.status == 'running', MediaJob.locked_at < datetime.utcnow() - timeout)
+                       .values(status='pending'))
+    db.session.commit()
+    claimed = []
+    candidates = (MediaJob.query.filter_by(status='pending')
+                  .order_by(MediaJob.id).limit(limit).all())
+    for job in candidates:
+        # Only one worker wins the conditional update for each job
+        won = db.session.execute(update(MediaJob)
+                                 .where(MediaJob.id == job.id, MediaJob.status == 'pending')
+                                 .values(status='running', attempts=MediaJob.attempts + 1,
+                                         locked_at=datetime.utcnow())).rowcount
+        if won:
+            claimed.append(job.id)
+    db.session.commit()
+    return MediaJob.query.filter(MediaJob.id.in_(claimed)).all() if claimed else []
+
+
+def finish_job(job, error=None, result=None):
+    if error is None:
+        job.status = 'done'
+        job.error = None
+        if job.kind == 'video':
+            video.record_metadata(job.key, result)
+    elif job.attempts < current_app.config['MEDIA_JOB_MAX_ATTEMPTS']:
+        job.status = 'pending'
+        job.error = error
+    else:
+        job.status = 'failed'
+        job.error = error
+    db.session.flush()
+    if job.status in ('done', 'failed'):
+        outstanding = MediaJob.query.filter(MediaJob.key == job.key,
+                                            MediaJob.status.in_(('pending', 'running'))).count()
+        if job.status == 'failed' or not outstanding:
+            db.session.execute(update(Post)
+                               .where(Post.media_url == job.key, Post.media_status == 'processing')
+                               .values(media_status='ready' if job.status == 'done' else 'failed'))
+    db.session.commit()
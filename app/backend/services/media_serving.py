@@ -0,0 +1,90 @@
+"""Sending stored media: either streamed by Flask or handed off to the reverse proxy."""
+import mimetypes
+import os
+import re
+from flask import current_app, request, send_from_directory, make_response
+from services.media import UPLOAD_FOLDER, relative_media_path
+from services.storage import get_storage
+from services import images, media_signing, cdn
+
+# <sha256>.<ext> originals and <sha256>.<variant>.<ext> derived files: the name is the content
+FINGERPRINTED_RE = re.compile(r'^[0-9a-f]{64}(\.[a-z0-9]+)?\.[a-z0-9]+$')
+
+
+def fingerprint_etag(filename):
+    """Strong ETag for a content-addressed file, or None for legacy names.
+
+    The whole name, extension included, so each encoding of an image
+    (``.w480.jpg``, ``.w480.webp``) has its own validator.
+    """
+    if FINGERPRINTED_RE.match(filename):
+        return filename
+    return None
+
+
+def not_modified(filename):
+    """Answer a revalidation of fingerprinted media without touching the disk"""
+    # Any encoding the client still accepts is as good as the one it would get now
+    for name in images.negotiate(filename, request.accept_mimetypes):
+        etag = fingerprint_etag(name)
+        if etag and etag in request.if_none_match:
+            response = make_response('', 304)
+            return _cache_headers(response, name, etag, negotiated=images.has_alternates(filename))
+    return None
+
+
+def _cache_headers(response, filename, etag, negotiated=False):
+    cdn.tag_response(response, filename)
+    if negotiated:
+        response.vary.add('Accept')
+    if etag:
+        response.set_etag(etag)
+        max_age = media_signing.cache_lifetime(current_app.config['MEDIA_CACHE_MAX_AGE'])
+        response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+    return response
+
+
+def send_media(filename):
+    """Build the response for one stored media file.
+
+    MEDIA_OFFLOAD selects who moves the bytes:
+      none       - Werkzeug streams the file itself (Range/206, If-Range and
+                   wsgi.file_wrapper, which gunicorn turns into sendfile())
+      x-sendfile - X-Sendfile header for Apache mod_xsendfile / lighttpd
+      x-accel    - X-Accel-Redirect into an nginx `internal` location at
+                   MEDIA_ACCEL_PREFIX that aliases the uploads folder
+    With an offload mode Flask answers with an empty 200 and no Range or
+    Content-Length handling; the proxy produces the body, the 206 and the
+    Content-Range itself, so the Python worker never touches media bytes.
+
+    Content-addressed files get their hash as a strong ETag and an
+    immutable Cache-Control; legacy names keep Werkzeug's mtime/size ETag
+    and plain revalidation, since an old filename could be reused.
+
+    Images are negotiated on Accept: the AVIF or WebP encoding is sent
+    when the client lists it and it has been generated, with Vary: Accept.
+    (nginx drops Vary on X-Accel-Redirect; add it in the internal location.)
+
+    Every response carries the CDN purge tag of its upload (services/cdn.py).
+    """
+    negotiated = images.has_alternates(filename)
+    if negotiated:
+        storage = get_storage()
+        filename = next(name for name in images.negotiate(filename, request.accept_mimetypes)
+                        if name == filename or storage.exists(name))
+    etag = fingerprint_etag(filename)
+    offload = current_app.config['MEDIA_OFFLOAD']
+    path = relative_media_path(filename)
+    if offload == 'x-accel':
+        header, value = 'X-Accel-Redirect', current_app.config['MEDIA_ACCEL_PREFIX'].rstrip('/') + '/' + path
+    elif offload == 'x-sendfile':
+        header, value = 'X-Sendfile', os.path.join(UPLOAD_FOLDER, path)
+    else:
+        response = send_from_directory(UPLOAD_FOLDER, path, conditional=True, etag=etag or True)
+        return _cache_headers(response, filename, etag, negotiated)
+    response = current_app.response_class(status=200)
+    response.automatically_set_content_length = False  # the proxy sets it for the body it sends
+    response.headers[header] = value
+    response.headers['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    # nginx keeps Cache-Control across the internal redirect and adds its own ETag
+    return _cache_headers(response, filename, etag, negotiated)
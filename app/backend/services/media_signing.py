@@ -0,0 +1,63 @@
+"""Signed, expiring /uploads URLs.
+
+get_media_url appends ``?e=<expires>&s=<signature>``, an HMAC-SHA256 of the
+filename and expiry under MEDIA_SIGNING_KEY. The /uploads route checks it
+with hmac.compare_digest and no database access, so only clients that were
+handed the URL by an authorised API response (e.g. a listing that already
+applied visibility rules) can fetch the file.
+
+Expiries are rounded up to MEDIA_URL_TTL windows: every response within a
+window links the same URL, so browsers and CDNs keep caching it, and each
+link stays valid for at least one full window.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from flask import current_app, request
+
+SIGNATURE_BYTES = 16
+
+
+def url_window():
+    """Index of the current signing window; part of the ETags of responses that embed media URLs"""
+    if current_app.config['MEDIA_URL_SIGNING'] == 'off':
+        return 0
+    return int(time.time()) // current_app.config['MEDIA_URL_TTL']
+
+
+def _signature(filename, expires):
+    key = (current_app.config['MEDIA_SIGNING_KEY'] or current_app.config['SECRET_KEY']).encode()
+    digest = hmac.new(key, f'{filename}:{expires}'.encode(), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+def signed_params(filename):
+    """Query parameters that authorise fetching filename until the end of the next window"""
+    if current_app.config['MEDIA_URL_SIGNING'] == 'off':
+        return {}
+    expires = (url_window() + 2) * current_app.config['MEDIA_URL_TTL']
+    return {'e': expires, 's': _signature(filename, expires)}
+
+
+def verify_request(filename):
+    """Whether this request may fetch filename, according to MEDIA_URL_SIGNING.
+
+    'enforce' requires a valid signature, 'optional' only rejects bad ones
+    (while clients still build unsigned URLs), 'off' accepts everything.
+    """
+    mode = current_app.config['MEDIA_URL_SIGNING']
+    expires, signature = request.args.get('e', type=int), request.args.get('s')
+    if mode == 'off' or (mode == 'optional' and signature is None):
+        return True
+    if expires is None or signature is None or expires < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(filename, expires))
+
+
+def cache_lifetime(max_age):
+    """max_age, cut short so nothing is cached past the link's expiry"""
+    expires = request.args.get('e', type=int)
+    if expires is None or request.args.get('s') is None:
+        return max_age
+    return max(0, min(max_age, expires - int(time.time())))
@@ -0,0 +1,84 @@
+"""Resumable uploads: a session, fixed-size chunks written at their offsets, then finalize.
+
+Chunks are written in place into ``.partial-<session id>`` in the uploads
+folder, so a client that loses its connection asks for the current offset
+and continues from there. Finalizing hashes the assembled file and renames
+it to its content key; the session holds a blob reference from then on,
+which is handed over to the post it gets attached to.
+"""
+import os
+import uuid
+from sqlalchemy import update
+from models import db
+from models.media import UploadSession
+from services import media
+
+CHUNK_SIZE = 1024 * 1024  # every chunk but the last must be exactly this long
+
+
+class UploadError(ValueError):
+    pass
+
+
+def partial_path(session):
+    return os.path.join(media.UPLOAD_FOLDER, f'.partial-{session.id}')
+
+
+def create_session(user_id, filename, size):
+    session = UploadSession(id=uuid.uuid4().hex, user_id=user_id, filename=filename, size=size, received=0)
+    db.session.add(session)
+    db.session.commit()
+    open(partial_path(session), 'wb').close()
+    return session
+
+
+def write_chunk(session, offset, data):
+    """Write one chunk at offset; returns the new contiguous offset"""
+    if session.status != 'uploading':
+        raise UploadError('Upload is already complete.')
+    if offset != session.received:
+        raise UploadError(f'Expected offset {session.received}.')
+    is_last = offset + len(data) == session.size
+    if offset + len(data) > session.size or (len(data) != CHUNK_SIZE and not is_last):
+        raise UploadError(f'Chunks must be {CHUNK_SIZE} bytes (the last one may be shorter).')
+    with open(partial_path(session), 'r+b') as f:
+        f.seek(offset)
+        f.write(data)
+    # A retried chunk racing the original writes identical bytes; only one advances the offset
+    db.session.execute(update(UploadSession)
+                       .where(UploadSession.id == session.id, UploadSession.received == offset)
+                       .values(received=offset + len(data)))
+    db.session.commit()
+    db.session.refresh(session)
+    return session.received
+
+
+def finalize(session):
+    """Turn a fully received session into a stored media key"""
+    if session.status != 'uploading':
+        return session.key
+    if session.received != session.size:
+        raise UploadError(f'Upload incomplete ({session.received} of {session.size} bytes).')
+    try:
+        session.key = media.store_assembled(partial_path(session), session.filename)
+    except media.UnsupportedMediaType:
+        os.remove(partial_path(session))
+        db.session.delete(session)
+        db.session.commit()
+        raise
+    # Hold a reference so the file survives until claim() hands it to a post
+    media.acquire(session.key)
+    session.status = 'complete'
+    db.session.commit()
+    return session.key
+
+
+def claim(upload_id, user_id):
+    """Attach a completed upload to a post: returns its key, whose reference now belongs to the caller"""
+    session = db.session.get(UploadSession, upload_id)
+    if not session or session.user_id != int(user_id):
+        raise UploadError('Upload not found.')
+    if session.status != 'complete':
+        raise UploadError('Upload is not complete.')
+    session.status = 'attached'
+    return session.key
@@ -0,0 +1,219 @@
+"""Full-text search over post titles and content.
+
+Each backend pushes matching and ranking down to the database's own
+full-text engine. The index is kept in sync by the database itself
+(triggers on SQLite, FULLTEXT on MySQL, a generated tsvector on Postgres),
+so create, edit and delete need no extra application code.
+
+The index structures are created by the c37d0e9a5f16 migration. At startup
+init_search only checks that they exist (falling back to LIKE search when
+they don't); the one exception is SQLite, whose FTS table and triggers are
+also created here for databases made by db.create_all() instead of
+migrations.
+"""
+import html
+import re
+from flask import current_app
+from sqlalchemy import text, table, column, select, literal_column, or_, func, false
+from models import db
+from models.post import Post
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+SNIPPET_RADIUS = 60
+# Hit delimiters for database snippet functions; swapped for <mark> after escaping
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def search_terms(search):
+    """Split user input into plain word tokens, dropping any query syntax"""
+    return [w.lower() for w in WORD_RE.findall(search or '')][:16]
+
+
+def highlight(snippet):
+    """HTML-escape a snippet and turn the MARK_START/MARK_END sentinels into <mark> tags.
+
+    Post content is user input, so the <mark> tags are the only markup a
+    snippet may carry.
+    """
+    return html.escape(snippet or '').replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def make_snippet(content, terms):
+    """Cut a window of content around the first matching term and mark hits"""
+    if not content:
+        return ''
+    lowered = content.lower()
+    hits = [lowered.find(t) for t in terms if lowered.find(t) >= 0]
+    start = max(min(hits) - SNIPPET_RADIUS, 0) if hits else 0
+    end = start + 2 * SNIPPET_RADIUS
+    snippet = content[start:end].replace(MARK_START, '').replace(MARK_END, '')
+    if terms:
+        pattern = re.compile('|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+        snippet = pattern.sub(lambda m: f'{MARK_START}{m.group()}{MARK_END}', snippet)
+    return ('…' if start > 0 else '') + highlight(snippet) + ('…' if end < len(content) else '')
+
+
+class LikeSearchBackend:
+    """Fallback for databases without a supported full-text engine"""
+    name = 'like'
+
+    def ready(self, connection):
+        """Whether the database has this backend's index structures"""
+        return True
+
+    def apply(self, query, search, rank=False):
+        like = f"%{search.lower()}%"
+        return query.filter(or_(Post.title.ilike(like), Post.content.ilike(like)))
+
+    def snippets(self, posts, search):
+        terms = search_terms(search)
+        return {p.id: make_snippet(p.content, terms) for p in posts}
+
+
+class SQLiteSearchBackend(LikeSearchBackend):
+    """FTS5 external-content table over posts, maintained by triggers"""
+    name = 'sqlite'
+    fts = table('posts_fts', column('rowid'))
+
+    DDL = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+        "title, content, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN "
+        "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+        "CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN "
+        "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+        "CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF title, content ON posts BEGIN "
+        "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+        "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    ]
+
+    def ready(self, connection):
+        # Cheap and idempotent, so it also covers create_all databases that never ran the migration
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")).first()
+        for statement in self.DDL:
+            connection.execute(text(statement))
+        # A posts table recreated under an existing index (drop_all/create_all, dev_reset_db.py)
+        # leaves the old rows indexed; rebuilding from an empty table is free
+        if not exists or connection.execute(text("SELECT 1 FROM posts LIMIT 1")).first() is None:
+            connection.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+        return True
+
+    @staticmethod
+    def match_expression(search):
+        # Quote every token so user input can never be parsed as FTS5 syntax
+        return ' '.join(f'"{t}"*' for t in search_terms(search))
+
+    def apply(self, query, search, rank=False):
+        expression = self.match_expression(search)
+        if not expression:
+            return query.filter(false())  # nothing searchable, e.g. only punctuation
+        query = query.join(self.fts, self.fts.c.rowid == Post.id) \
+            .filter(text('posts_fts MATCH :fts_query').bindparams(fts_query=expression))
+        if rank:
+            # bm25 weights: title matches count three times as much as content
+            query = query.order_by(text('bm25(posts_fts, 3.0, 1.0)'))
+        return query
+
+    def snippets(self, posts, search):
+        expression = self.match_expression(search)
+        ids = [p.id for p in posts]
+        if not expression or not ids:
+            return {}
+        rows = db.session.execute(
+            select(literal_column('rowid'),
+                   func.snippet(literal_column('posts_fts'), 1, MARK_START, MARK_END, '…', 16))
+            .select_from(self.fts)
+            .where(text('posts_fts MATCH :fts_query').bindparams(fts_query=expression))
+            .where(literal_column('rowid').in_(ids))
+        )
+        return {post_id: highlight(snippet) for post_id, snippet in rows}
+
+
+class MySQLSearchBackend(LikeSearchBackend):
+    """InnoDB FULLTEXT index on (title, content), queried in boolean mode"""
+    name = 'mysql'
+    index_name = 'ft_posts_title_content'
+
+    def ready(self, connection):
+        return connection.execute(text(
+            "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() "
+            "AND table_name = 'posts' AND index_name = :name"), {'name': self.index_name}).first() is not None
+
+    def apply(self, query, search, rank=False):
+        terms = search_terms(search)
+        if not terms:
+            return query.filter(false())
+        expression = ' '.join(f'+{t}*' for t in terms)
+        match = text('MATCH (posts.title, posts.content) AGAINST (:ft_query IN BOOLEAN MODE)') \
+            .bindparams(ft_query=expression)
+        query = query.filter(match)
+        if rank:
+            query = query.order_by(text('MATCH (posts.title, posts.content) AGAINST (:ft_rank_query) DESC')
+                                   .bindparams(ft_rank_query=' '.join(terms)))
+        return query
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+    """Stored tsvector column (title weighted above content) with a GIN index"""
+    name = 'postgresql'
+
+    def ready(self, connection):
+        return connection.execute(text(
+            "SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() "
+            "AND table_name = 'posts' AND column_name = 'search_vector'")).first() is not None
+
+    @staticmethod
+    def tsquery(search):
+        return ' & '.join(f'{t}:*' for t in search_terms(search))
+
+    def apply(self, query, search, rank=False):
+        expression = self.tsquery(search)
+        if not expression:
+            return query.filter(false())
+        query = query.filter(text("posts.search_vector @@ to_tsquery('english', :ts_query)")
+                             .bindparams(ts_query=expression))
+        if rank:
+            query = query.order_by(text("ts_rank_cd(posts.search_vector, to_tsquery('english', :ts_rank_query)) DESC")
+                                   .bindparams(ts_rank_query=expression))
+        return query
+
+    def snippets(self, posts, search):
+        expression = self.tsquery(search)
+        ids = [p.id for p in posts]
+        if not expression or not ids:
+            return {}
+        rows = db.session.execute(
+            select(Post.id, func.ts_headline(
+                'english', Post.content, func.to_tsquery('english', expression),
+                f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10'))
+            .where(Post.id.in_(ids)))
+        return {post_id: highlight(snippet) for post_id, snippet in rows}
+
+
+BACKENDS = {b.name: b for b in (LikeSearchBackend, SQLiteSearchBackend, MySQLSearchBackend, PostgresSearchBackend)}
+
+
+def init_search(app):
+    """Pick a backend for the configured database; LIKE search if its index is missing"""
+    name = app.config.get('SEARCH_BACKEND', 'auto')
+    with app.app_context():
+        if name == 'auto':
+            name = db.engine.dialect.name
+        backend = BACKENDS.get(name, LikeSearchBackend)()
+        try:
+            with db.engine.begin() as connection:
+                ready = backend.ready(connection)
+        except Exception as e:
+            app.logger.warning(f'Full-text search unavailable ({e}); falling back to LIKE search')
+            backend = LikeSearchBackend()
+        else:
+            if not ready:
+                app.logger.warning(f'No {backend.name} full-text index (run the migrations); falling back to LIKE search')
+                backend = LikeSearchBackend()
+    app.extensions['search'] = backend
+    return backend
+
+
+def get_search_backend():
+    return current_app.extensions.get('search') or LikeSearchBackend()
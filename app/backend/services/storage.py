@@ -0,0 +1,256 @@
+"""Where media bytes live: the local uploads folder or an S3-compatible bucket.
+
+Keys are the flat names stored in Post.media_url / User.avatar. Uploads are
+always staged in UPLOAD_FOLDER first (streamed, hashed, size-limited) and
+then handed to the backend with save(). With the S3 backend, reads go to
+presigned URLs and clients may upload straight to the bucket, so media
+bytes never pass through a Flask worker.
+
+STORAGE_BACKEND=s3 works with AWS S3, MinIO or any other S3 API; point
+S3_ENDPOINT_URL at the server (e.g. http://localhost:9000 for a local MinIO
+or ``moto_server``). The backend is also kept at module level so media
+worker processes can use it without an app context.
+"""
+import base64
+import glob
+import hashlib
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+HEX_STEM_RE = re.compile(r'^[0-9a-f]{4,}$')
+MAX_PRESIGN_EXPIRES = 7 * 24 * 3600  # SigV4 limit
+
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+
+def shard_dir(name):
+    """Directory a media file belongs in, relative to UPLOAD_FOLDER.
+
+    Sharded on the content hash, so an original and its derived files
+    (``<sha256>.w480.jpg`` ...) share a directory; legacy names are hashed.
+    """
+    stem = name.split('.', 1)[0]
+    digest = stem if HEX_STEM_RE.match(stem) else hashlib.sha256(stem.encode()).hexdigest()
+    return os.path.join(digest[:2], digest[2:4])
+
+
+def sharded_path(name, create=False):
+    """Where a media file is written; create=True makes its directory"""
+    directory = os.path.join(UPLOAD_FOLDER, shard_dir(name))
+    if create:
+        os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+def media_path(key):
+    """Absolute path of a stored media file, in whichever layout it currently is.
+
+    The sharded path is checked first and is the answer for missing files:
+    shard_uploads.py renames atomically, so a file moved between the two
+    checks is found at the sharded path.
+    """
+    path = sharded_path(key)
+    if os.path.exists(path):
+        return path
+    flat = os.path.join(UPLOAD_FOLDER, key)
+    return flat if os.path.exists(flat) else path
+
+
+def relative_media_path(key):
+    """media_path() relative to UPLOAD_FOLDER, for send_from_directory and proxy offload"""
+    return os.path.relpath(media_path(key), UPLOAD_FOLDER)
+
+
+def staging_path(name=None):
+    """A temp file in UPLOAD_FOLDER (same filesystem, so keeping it is a rename)"""
+    return os.path.join(UPLOAD_FOLDER, f'.tmp-{name or uuid.uuid4().hex}')
+
+
+class LocalStorage:
+    """Files in UPLOAD_FOLDER, served by Flask (or the proxy, see media_serving.py)"""
+
+    direct_uploads = False
+
+    def save(self, key, path):
+        """Take ownership of a finished local file; an existing copy of the key wins"""
+        existing = media_path(key)
+        if os.path.exists(existing):
+            try:
+                # It may be an orphan; a fresh mtime keeps gc_uploads.py off it until this upload commits
+                os.utime(existing)
+                os.remove(path)
+                return
+            except FileNotFoundError:
+                pass  # collected meanwhile; keep this copy instead
+        os.replace(path, sharded_path(key, create=True))
+
+    def exists(self, key):
+        return os.path.exists(media_path(key))
+
+    def size(self, key):
+        return os.path.getsize(media_path(key))
+
+    def read_head(self, key, length):
+        with open(media_path(key), 'rb') as f:
+            return f.read(length)
+
+    def delete(self, key):
+        path = media_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def derived_keys(self, key):
+        """Stored files generated from key (variants, posters, ...)"""
+        stem = key.rsplit('.', 1)[0]
+        pattern = glob.escape(stem) + '.*'
+        names = set()
+        for directory in (os.path.dirname(sharded_path(key)), UPLOAD_FOLDER):
+            names.update(os.path.basename(p) for p in glob.glob(os.path.join(glob.escape(directory), pattern)))
+        names.discard(key)
+        return sorted(names)
+
+    @contextmanager
+    def local_copy(self, key):
+        yield media_path(key)
+
+    def url(self, key):
+        return None  # served by the /uploads route
+
+    def url_version(self):
+        return 0
+
+    def presign_upload(self, key, size, sha256):
+        return None
+
+
+class S3Storage:
+    """Objects in an S3-compatible bucket, read and written through presigned URLs"""
+
+    direct_uploads = True
+
+    def __init__(self, bucket, endpoint_url=None, region=None, access_key=None, secret_key=None,
+                 prefix='', public_url=None, url_expires=3600):
+        import boto3  # optional dependency, only needed when STORAGE_BACKEND=s3
+        from botocore.config import Config as BotoConfig
+        self.session = boto3.session.Session(aws_access_key_id=access_key, aws_secret_access_key=secret_key,
+                                             region_name=region)
+        self.client = self.session.client('s3', endpoint_url=endpoint_url,
+                                          config=BotoConfig(signature_version='s3v4'))
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_url = public_url.rstrip('/') if public_url else None
+        self.url_expires = url_expires
+        # Presigned GETs are signed as of the start of a window and stay valid for two, so a link
+        # is the same for a whole window (cacheable) and valid for at least url_expires seconds
+        self.url_window = min(url_expires, MAX_PRESIGN_EXPIRES // 2)
+
+    def _object(self, key):
+        return f'{self.prefix}{key}'
+
+    def _head(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def save(self, key, path):
+        try:
+            if self._head(key) is None:
+                self.client.upload_file(path, self.bucket, self._object(key))
+        finally:
+            os.remove(path)
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def size(self, key):
+        return self._head(key)['ContentLength']
+
+    def read_head(self, key, length):
+        response = self.client.get_object(Bucket=self.bucket, Key=self._object(key), Range=f'bytes=0-{length - 1}')
+        return response['Body'].read()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object(key))
+
+    def derived_keys(self, key):
+        stem = key.rsplit('.', 1)[0]
+        response = self.client.list_objects_v2(Bucket=self.bucket, Prefix=self._object(f'{stem}.'))
+        names = [item['Key'][len(self.prefix):] for item in response.get('Contents', [])]
+        return sorted(name for name in names if name != key)
+
+    @contextmanager
+    def local_copy(self, key):
+        """Download to a temp file for processing (image variants, video probing)"""
+        path = staging_path()
+        try:
+            self.client.download_file(self.bucket, self._object(key), path)
+            yield path
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def url_version(self):
+        """Index of the presigning window; part of the ETags of responses that embed media URLs"""
+        return 0 if self.public_url else int(time.time()) // self.url_window
+
+    def url(self, key):
+        if self.public_url:
+            return f'{self.public_url}/{self._object(key)}'
+        from botocore.auth import S3SigV4QueryAuth
+        from botocore.awsrequest import AWSRequest
+
+        class WindowQueryAuth(S3SigV4QueryAuth):
+            def _modify_request_before_signing(self, request):
+                request.context['timestamp'] = signed_at
+                super()._modify_request_before_signing(request)
+
+        signed_at = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(self.url_version() * self.url_window))
+        # botocore resolves the endpoint and addressing style; the link is then re-signed at the window start
+        unsigned = self.client.generate_presigned_url('get_object', Params={'Bucket': self.bucket, 'Key': self._object(key)})
+        request = AWSRequest(method='GET', url=unsigned.split('?', 1)[0])
+        WindowQueryAuth(self.session.get_credentials().get_frozen_credentials(), 's3',
+                        self.client.meta.region_name, expires=2 * self.url_window).add_auth(request)
+        return request.url
+
+    def presign_upload(self, key, size, sha256):
+        """A PUT the client sends the file with; S3 rejects bodies that don't match the signed checksum"""
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = self.client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': self.bucket, 'Key': self._object(key), 'ContentLength': size,
+                    'ChecksumSHA256': checksum},
+            ExpiresIn=self.url_expires)
+        return {'method': 'PUT', 'url': url,
+                'headers': {'Content-Length': str(size), 'x-amz-checksum-sha256': checksum}}
+
+
+_storage = LocalStorage()
+
+
+def create_storage(config):
+    if config.get('STORAGE_BACKEND', 'local') == 's3':
+        return S3Storage(config['S3_BUCKET'], endpoint_url=config.get('S3_ENDPOINT_URL'),
+                         region=config.get('S3_REGION'), access_key=config.get('S3_ACCESS_KEY_ID'),
+                         secret_key=config.get('S3_SECRET_ACCESS_KEY'), prefix=config.get('S3_PREFIX', ''),
+                         public_url=config.get('S3_PUBLIC_URL'), url_expires=config.get('S3_URL_EXPIRES', 3600))
+    return LocalStorage()
+
+
+def init_storage(app):
+    """Attach the media storage backend selected by STORAGE_BACKEND"""
+    global _storage
+    _storage = create_storage(app.config)
+    app.extensions['storage'] = _storage
+    return _storage
+
+
+def get_storage():
+    return _storage
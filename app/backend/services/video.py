@@ -0,0 +1,79 @@
+"""Video poster frames and metadata.
+
+The media worker probes each uploaded video with the ffmpeg binary bundled
+by imageio-ffmpeg: duration and display dimensions go on the post, and one
+frame is stored as ``<stem>.poster.jpg`` (plus the WebP/AVIF encodings
+from services/images.py), so feed cards can show the video without
+downloading it.
+"""
+from PIL import Image
+from sqlalchemy import update
+from models import db
+from models.post import Post
+from services import images
+from services.storage import get_storage
+
+VIDEO_EXTENSIONS = {'mp4', 'mov', 'webm'}
+POSTER_AT = 1.0  # seconds in, past the black/fade-in first frame most clips start with
+
+
+def is_video(key):
+    return bool(key) and '.' in key and key.rsplit('.', 1)[1].lower() in VIDEO_EXTENSIONS
+
+
+def poster_name(key):
+    return f'{key.rsplit(".", 1)[0]}.poster.jpg'
+
+
+def poster_ready(key):
+    return get_storage().exists(poster_name(key))
+
+
+def _read_frame(path, seek):
+    import imageio_ffmpeg  # optional dependency, only needed by the media worker
+    reader = imageio_ffmpeg.read_frames(path, input_params=['-ss', str(seek)], output_params=['-frames:v', '1'])
+    try:
+        meta = next(reader)
+        frame = next(reader, None)
+    finally:
+        reader.close()
+    return meta, frame
+
+
+def probe(key):
+    """Store the poster frame of a video; returns {'duration', 'width', 'height'}.
+
+    Runs in a worker process, so it only touches files.
+    """
+    with get_storage().local_copy(key) as path:
+        meta, frame = _read_frame(path, POSTER_AT)
+        if frame is None:  # clip shorter than POSTER_AT
+            meta, frame = _read_frame(path, 0)
+    if frame is None:
+        raise ValueError(f'No video frames in {key}')
+    # Display size: ffmpeg applies rotation metadata (portrait phone clips) and reports the rotated size
+    width, height = meta['size']
+    poster = Image.frombytes('RGB', (width, height), frame)
+    name = poster_name(key)
+    for filename in [name] + [images.alternate_name(name, fmt) for fmt in images.ALTERNATE_FORMATS]:
+        images.save_rendition(poster, filename)
+    duration = meta.get('duration')
+    return {'duration': round(duration, 3) if duration else None, 'width': width, 'height': height}
+
+
+def record_metadata(key, metadata):
+    """Copy probe results onto every post using this video"""
+    db.session.execute(update(Post).where(Post.media_url == key)
+                       .values(media_duration=metadata['duration'], media_width=metadata['width'],
+                               media_height=metadata['height']))
+
+
+def copy_known_metadata(post):
+    """Fill a post's video fields from another post with the same upload, if it was probed already"""
+    post.media_duration = post.media_width = post.media_height = None
+    if not is_video(post.media_url):
+        return
+    known = (Post.query.filter(Post.media_url == post.media_url, Post.media_width.isnot(None))
+             .with_entities(Post.media_duration, Post.media_width, Post.media_height).first())
+    if known:
+        post.media_duration, post.media_width, post.media_height = known
@@ -0,0 +1,93 @@
+"""Write-behind view counting.
+
+Views are buffered in memory per worker and written back as one
+aggregated ``views_count = views_count + n`` per post, so popular posts
+do not turn into a hot row updated on every request. A crash loses at
+most VIEW_FLUSH_MAX_PENDING views or VIEW_FLUSH_INTERVAL seconds of
+views from that worker, whichever bound is hit first.
+
+Flushes keep updated_at as it is (views are not edits); listings see
+them through the sum of views_count in posts_version, which every worker
+reads from the database.
+"""
+import atexit
+import os
+import threading
+from collections import Counter
+from flask import current_app
+from sqlalchemy import bindparam
+from models import db
+from models.post import Post
+
+
+class ViewCounter:
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config['VIEW_FLUSH_INTERVAL']
+        self.max_pending = app.config['VIEW_FLUSH_MAX_PENDING']
+        self._pending = Counter()
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._wakeup = threading.Event()
+        atexit.register(self.flush)
+
+    def _ensure_thread(self):
+        # Started lazily and per process so forked workers each get their own flusher
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='view-counter-flush', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error(f'View count flush failed: {e}')
+
+    def record(self, post_id, count=1):
+        with self._lock:
+            self._ensure_thread()
+            self._pending[post_id] += count
+            self._pending_total += count
+            full = self._pending_total >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write all buffered views in one transaction; returns the number of posts updated"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+                self._pending_total = 0
+            if not pending:
+                return 0
+            posts = Post.__table__
+            stmt = posts.update().where(posts.c.id == bindparam('post_id')).values(
+                views_count=db.func.coalesce(posts.c.views_count, 0) + bindparam('delta'),
+                updated_at=posts.c.updated_at)  # views are not edits
+            params = [{'post_id': post_id, 'delta': delta} for post_id, delta in pending.items()]
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as connection:
+                        connection.execute(stmt, params)
+            except Exception:
+                # Put the counts back so the next flush retries them
+                with self._lock:
+                    self._pending.update(pending)
+                    self._pending_total += sum(pending.values())
+                raise
+            return len(params)
+
+
+def init_view_counter(app):
+    counter = ViewCounter(app)
+    app.extensions['view_counter'] = counter
+    return counter
+
+
+def get_view_counter():
+    return current_app.extensions['view_counter']
@@ -0,0 +1,53 @@
+import argparse
+import os
+import time
+from services import media
+
+# Move files from the flat uploads folder into the sharded layout, a batch at a time.
+# Safe to run while the app is serving: media_path() reads both layouts and each
+# move is a single rename. Re-running picks up whatever is still flat.
+parser = argparse.ArgumentParser(description='Move flat uploads into hashed subdirectories.')
+parser.add_argument('--batch-size', type=int, default=500)
+parser.add_argument('--pause', type=float, default=0.1, help='seconds to sleep between batches')
+parser.add_argument('--dry-run', action='store_true')
+args = parser.parse_args()
+
+
+def flat_files():
+    # scandir streams entries instead of building the full listing in memory
+    with os.scandir(media.UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            # Dot files are in-flight temp and partial uploads, owned by running requests
+            if entry.is_file(follow_symlinks=False) and not entry.name.startswith('.'):
+                yield entry.name
+
+
+def move_batch(names):
+    moved = duplicates = 0
+    for name in names:
+        source = os.path.join(media.UPLOAD_FOLDER, name)
+        target = media.sharded_path(name, create=not args.dry_run)
+        if args.dry_run:
+            print(f'{name} -> {os.path.relpath(target, media.UPLOAD_FOLDER)}')
+        elif os.path.exists(target):
+            # The same content key was stored again in the new layout meanwhile
+            os.remove(source)
+            duplicates += 1
+        else:
+            os.replace(source, target)
+            moved += 1
+    return moved, duplicates
+
+
+moved = duplicates = 0
+batch = []
+for name in flat_files():
+    batch.append(name)
+    if len(batch) == args.batch_size:
+        counts = move_batch(batch)
+        moved, duplicates = moved + counts[0], duplicates + counts[1]
+        batch = []
+        time.sleep(args.pause)
+counts = move_batch(batch)
+moved, duplicates = moved + counts[0], duplicates + counts[1]
+print(f'Moved {moved} files into the sharded layout, removed {duplicates} duplicates.')
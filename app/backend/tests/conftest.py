@@ -0,0 +1,120 @@
+"""Shared fixtures: the Flask app on a throwaway SQLite database and uploads folder.
+
+main.py reads DATABASE_URL and UPLOAD_FOLDER at import time, so both are
+pointed at a temp directory before it is imported. Every test starts from
+empty tables, a fresh cache and a freshly built search index.
+"""
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+WORKDIR = tempfile.mkdtemp(prefix='prok-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(WORKDIR, "test.db")}'
+os.environ['UPLOAD_FOLDER'] = os.path.join(WORKDIR, 'uploads')
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from main import app as flask_app  # noqa: E402  (environment must be set first)
+from models import db  # noqa: E402
+from models.post import Post  # noqa: E402
+from models.user import User  # noqa: E402
+from services.cache import init_cache  # noqa: E402
+from services.search import init_search  # noqa: E402
+from services import storage as storage_module  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+    init_search(flask_app)
+    init_cache(flask_app)
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def users(app):
+    """alice and bob; returns their ids"""
+    with app.app_context():
+        created = []
+        for name in ('alice', 'bob'):
+            user = User(username=name, email=f'{name}@example.com')
+            user.set_password('Passw0rd!')
+            db.session.add(user)
+            created.append(user)
+        db.session.commit()
+        return [user.id for user in created]
+
+
+@pytest.fixture
+def auth(app):
+    """Authorization headers for a user id"""
+    def headers(user_id):
+        with app.app_context():
+            return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+    return headers
+
+
+@pytest.fixture
+def make_posts(app):
+    """Insert count posts alternating between the given authors; returns their ids"""
+    def make(count, user_ids, **fields):
+        base = datetime(2025, 1, 1)
+        with app.app_context():
+            posts = [Post(user_id=user_ids[i % len(user_ids)], title=f'post {i}', content=f'content of post {i}',
+                          category='tech' if i % 2 else 'life', visibility='Public',
+                          created_at=base + timedelta(minutes=i // 2), likes_count=i % 4, views_count=0,
+                          **fields)
+                     for i in range(count)]
+            db.session.add_all(posts)
+            db.session.commit()
+            return [post.id for post in posts]
+    return make
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting every SQL statement run inside it"""
+    class Recorder:
+        def __enter__(self):
+            self.statements = []
+            with app.app_context():
+                self.engine = db.engine
+            event.listen(self.engine, 'before_cursor_execute', self._record)
+            return self.statements
+
+        def _record(self, conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        def __exit__(self, *exc):
+            event.remove(self.engine, 'before_cursor_execute', self._record)
+    return Recorder
+
+
+@pytest.fixture
+def s3_storage(app, monkeypatch):
+    """S3Storage against moto's in-process S3 stand-in, installed as the app's storage"""
+    moto = pytest.importorskip('moto')
+    with moto.mock_aws():
+        storage = storage_module.create_storage({
+            'STORAGE_BACKEND': 's3', 'S3_BUCKET': 'media', 'S3_REGION': 'us-east-1',
+            'S3_ACCESS_KEY_ID': 'testing', 'S3_SECRET_ACCESS_KEY': 'testing', 'S3_URL_EXPIRES': 3600})
+        storage.client.create_bucket(Bucket='media')
+        monkeypatch.setattr(storage_module, '_storage', storage)
+        yield storage
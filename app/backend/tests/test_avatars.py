@@ -0,0 +1,63 @@
+"""Fixed-size avatar renditions: picking a size, ?size= on /uploads and avatar_url in /api/users."""
+import io
+
+import pytest
+from PIL import Image
+
+from models import db
+from models.media import MediaJob
+from models.user import User
+from services import images, media_jobs
+from services.storage import get_storage
+
+
+@pytest.mark.parametrize('size, rendition', [
+    (1, 40), (40, 40), (41, 80), (80, 80), (160, 160), (161, 320), (320, 320), (321, 320), (2000, 320),
+])
+def test_smallest_covering_rendition(size, rendition):
+    assert images.avatar_for_size('ab.png', size) == f'ab.a{rendition}.jpg'
+
+
+def upload_avatar(client, headers):
+    buffer = io.BytesIO()
+    Image.new('RGB', (500, 300), 'teal').save(buffer, 'PNG')
+    response = client.post('/api/profile/image', headers=headers, content_type='multipart/form-data',
+                           data={'image': (io.BytesIO(buffer.getvalue()), 'me.png')})
+    assert response.status_code == 200
+    return response.json['profile']['avatar']
+
+
+def test_upload_queues_renditions(client, users, auth, app):
+    key = upload_avatar(client, auth(users[0]))
+    assert not any(get_storage().exists(name) for name in images.avatar_names(key).values())
+    with app.app_context():
+        assert {job.kind for job in MediaJob.query.filter_by(key=key)} == {'variants', 'avatars'}
+        media_jobs.run_job('avatars', key)
+    for size, name in images.avatar_names(key).items():
+        with get_storage().local_copy(name) as path, Image.open(path) as image:
+            assert image.size == (size, size)
+    assert images.avatars_ready(key)
+
+
+def test_size_parameter_picks_a_rendition(client, users, auth, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MEDIA_URL_SIGNING', 'off')
+    key = upload_avatar(client, auth(users[0]))
+    images.generate_avatar_renditions(key)
+    for size, rendition in ((40, 40), (41, 80), (320, 320), (321, 320)):
+        response = client.get(f'/uploads/v1/{key}?size={size}')
+        assert response.status_code == 200
+        assert Image.open(io.BytesIO(response.data)).size == (rendition, rendition)
+
+
+def test_user_list_links_the_covering_rendition(client, users, auth, app):
+    key = upload_avatar(client, auth(users[1]))
+    with app.app_context():
+        db.session.get(User, users[0]).avatar = 'https://example.com/me.png'  # external avatars are kept as is
+        db.session.commit()
+    viewer = auth(users[0])
+    [bob] = client.get('/api/users', headers=viewer).json['users']
+    assert f'{key[:-4]}.a80.jpg?' in bob['avatar_url']  # 40px circles on 2x screens by default
+    [bob] = client.get('/api/users?avatar_size=161', headers=viewer).json['users']
+    assert f'{key[:-4]}.a320.jpg?' in bob['avatar_url']
+    [alice] = client.get('/api/users', headers=auth(users[1])).json['users']
+    assert alice['avatar_url'] == 'https://example.com/me.png'
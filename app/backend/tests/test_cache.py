@@ -0,0 +1,106 @@
+"""VersionedCache: generations, the recompute lock and backend failures.
+
+Runs against the in-process backend and RedisCacheBackend on fakeredis.
+"""
+import threading
+import time
+
+import pytest
+
+from services.cache import MemoryCacheBackend, RedisCacheBackend, VersionedCache
+
+
+def redis_backend(server):
+    fakeredis = pytest.importorskip('fakeredis')
+    backend = RedisCacheBackend('redis://localhost:6379/0')
+    backend.client = fakeredis.FakeRedis(server=server)
+    return backend
+
+
+@pytest.fixture
+def fake_server():
+    fakeredis = pytest.importorskip('fakeredis')
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def cache(app, request, fake_server):
+    backend = MemoryCacheBackend() if request.param == 'memory' else redis_backend(fake_server)
+    with app.app_context():
+        yield VersionedCache(backend, 'test')
+
+
+def test_entries_are_cached_until_the_scope_is_invalidated(cache):
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)  # noqa: E731
+    assert cache.get_or_compute('posts', 'tags', compute) == 1
+    assert cache.get_or_compute('posts', 'tags', compute) == 1
+    cache.invalidate('posts')
+    assert cache.get_or_compute('posts', 'tags', compute) == 2
+
+
+def test_falsy_results_are_cached(cache):
+    calls = []
+    for _ in range(2):
+        assert cache.get_or_compute('posts', 'empty', lambda: calls.append(1) or []) == []
+    assert len(calls) == 1
+
+
+def test_failed_compute_releases_the_lock(cache):
+    def fail():
+        raise RuntimeError('database went away')
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('posts', 'tags', fail)
+    start = time.monotonic()
+    assert cache.get_or_compute('posts', 'tags', lambda: ['java']) == ['java']
+    assert time.monotonic() - start < 1
+
+
+def test_invalidation_reaches_every_worker(app, fake_server):
+    """Two workers on one Redis server: a bump by either hides entries from both"""
+    first, second = (VersionedCache(redis_backend(fake_server), 'test') for _ in range(2))
+    with app.app_context():
+        assert first.get_or_compute('posts', 'tags', lambda: ['old']) == ['old']
+        assert second.get_or_compute('posts', 'tags', lambda: ['unused']) == ['old']
+        assert second.invalidate('posts') == 1
+        assert first.generation('posts') == 1
+        assert first.get_or_compute('posts', 'tags', lambda: ['new']) == ['new']
+
+
+def test_waiters_take_the_result_of_the_lock_holder(app, fake_server):
+    workers = [VersionedCache(redis_backend(fake_server), 'test') for _ in range(4)]
+    calls, results = [], []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+
+    def run(cache):
+        with app.app_context():
+            results.append(cache.get_or_compute('posts', 'count', compute))
+    threads = [threading.Thread(target=run, args=(cache,)) for cache in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [1, 1, 1, 1]
+
+
+def test_redis_lock_is_released_when_compute_fails(app, fake_server):
+    def fail():
+        raise RuntimeError('database went away')
+    cache = VersionedCache(redis_backend(fake_server), 'test')
+    with app.app_context(), pytest.raises(RuntimeError):
+        cache.get_or_compute('posts', 'tags', fail)
+    assert cache.backend.client.keys('test:posts:*:lock') == []
+
+
+def test_entries_expire_after_their_ttl(cache):
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)  # noqa: E731
+    assert cache.get_or_compute('posts', 'count', compute, ttl=1) == 1
+    assert cache.get_or_compute('posts', 'count', compute, ttl=1) == 1
+    time.sleep(1.1)
+    assert cache.get_or_compute('posts', 'count', compute, ttl=1) == 2
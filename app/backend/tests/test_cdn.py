@@ -0,0 +1,102 @@
+"""Media links through a CDN: origin redirects, purge tags and purging deleted uploads."""
+import contextlib
+import io
+import json
+from urllib.error import URLError
+
+import pytest
+from PIL import Image
+
+from models import db
+from models.post import Post
+from services import cdn
+from services.storage import get_storage
+
+
+def upload_post(client, headers):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), 'navy').save(buffer, 'PNG')
+    response = client.post('/api/posts', headers=headers, content_type='multipart/form-data',
+                           data={'title': 't', 'content': 'c', 'media': (io.BytesIO(buffer.getvalue()), 'p.png')})
+    assert response.status_code == 201
+    return response.json
+
+
+class PurgeRecorder:
+    """Stands in for urlopen: keeps each purge request and what was committed when it was sent"""
+
+    def __init__(self):
+        self.sent = []
+        self.fail = False
+
+    def urlopen(self, request, timeout=None):
+        with db.engine.connect() as connection:
+            posts_left = connection.execute(db.select(db.func.count(Post.id))).scalar()
+        self.sent.append({'url': request.full_url, 'tags': json.loads(request.data)['tags'], 'posts_left': posts_left})
+        if self.fail:
+            raise URLError('connection refused')
+        return contextlib.nullcontext()
+
+
+@pytest.fixture
+def purges(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MEDIA_PURGE', 'webhook')
+    monkeypatch.setitem(app.config, 'MEDIA_PURGE_WEBHOOK', 'https://purge.example.com/hook')
+    recorder = PurgeRecorder()
+    monkeypatch.setattr(cdn.urllib.request, 'urlopen', recorder.urlopen)
+    return recorder
+
+
+def test_unversioned_links_move_to_the_media_origin(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MEDIA_ORIGIN', 'https://media.example.com/')
+    response = client.get('/uploads/' + 'ab' * 32 + '.png?e=1&s=sig')
+    assert response.status_code == 301
+    assert response.headers['Location'] == 'https://media.example.com/uploads/v1/' + 'ab' * 32 + '.png?e=1&s=sig'
+    monkeypatch.setitem(app.config, 'MEDIA_ORIGIN', None)
+    assert client.get('/uploads/' + 'ab' * 32 + '.png').status_code != 301
+
+
+def test_links_use_the_media_origin(client, users, auth, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MEDIA_ORIGIN', 'https://media.example.com')
+    post = upload_post(client, auth(users[0]))
+    assert post['media_url'].startswith('https://media.example.com/uploads/v1/')
+
+
+def test_responses_carry_the_upload_tag(client, users, auth, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MEDIA_URL_SIGNING', 'off')
+    key = upload_post(client, auth(users[0]))['media_url'].split('?', 1)[0].rsplit('/', 1)[1]
+    stem = key.split('.', 1)[0]
+    response = client.get(f'/uploads/v1/{key}')
+    assert response.headers['Surrogate-Key'] == stem
+    assert response.headers['Cache-Tag'] == stem
+    not_modified = client.get(f'/uploads/v1/{key}', headers={'If-None-Match': response.headers['ETag']})
+    assert not_modified.status_code == 304
+    assert not_modified.headers['Surrogate-Key'] == stem
+
+
+def test_deleting_the_last_reference_purges_after_commit(client, users, auth, purges):
+    headers = auth(users[0])
+    post = upload_post(client, headers)
+    key = post['media_url'].split('?', 1)[0].rsplit('/', 1)[1]
+    assert client.delete(f'/api/posts/{post["id"]}', headers=headers).status_code == 200
+    assert purges.sent == [{'url': 'https://purge.example.com/hook', 'tags': [key.split('.', 1)[0]], 'posts_left': 0}]
+
+
+def test_shared_media_is_not_purged(client, users, auth, purges):
+    headers = auth(users[0])
+    first, second = upload_post(client, headers), upload_post(client, headers)  # same bytes, same key
+    client.delete(f'/api/posts/{first["id"]}', headers=headers)
+    assert purges.sent == []
+    client.delete(f'/api/posts/{second["id"]}', headers=headers)
+    assert len(purges.sent) == 1
+
+
+def test_failed_purge_does_not_fail_the_delete(client, users, auth, purges):
+    purges.fail = True
+    headers = auth(users[0])
+    post = upload_post(client, headers)
+    key = post['media_url'].split('?', 1)[0].rsplit('/', 1)[1]
+    assert client.delete(f'/api/posts/{post["id"]}', headers=headers).status_code == 200
+    assert len(purges.sent) == 1
+    assert not get_storage().exists(key)
+    assert client.get('/api/my-posts', headers=headers).json == []
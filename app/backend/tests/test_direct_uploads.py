@@ -0,0 +1,57 @@
+"""media_key on posts and avatars: only keys the caller presigned through /api/uploads/direct."""
+import hashlib
+import io
+
+from PIL import Image
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def presign(client, headers, data):
+    response = client.post('/api/uploads/direct', headers=headers, json={
+        'filename': 'photo.png', 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()})
+    assert response.status_code == 200
+    return response.json['media_key']
+
+
+def put_object(storage, key, data):
+    storage.client.put_object(Bucket=storage.bucket, Key=storage._object(key), Body=data)
+
+
+def test_media_key_needs_direct_uploads(client, users, auth):
+    key = hashlib.sha256(b'anything').hexdigest() + '.png'
+    response = client.post('/api/posts', headers=auth(users[0]),
+                           data={'title': 't', 'content': 'c', 'media_key': key})
+    assert response.status_code == 400
+    assert 'not enabled' in response.json['msg']
+
+
+def test_presigned_key_attaches_for_its_owner(client, users, auth, s3_storage):
+    data = png_bytes()
+    headers = auth(users[0])
+    key = presign(client, headers, data)
+    put_object(s3_storage, key, data)
+    response = client.post('/api/posts', headers=headers, data={'title': 't', 'content': 'c', 'media_key': key})
+    assert response.status_code == 201
+    # The presign is used up by attaching it
+    response = client.post('/api/posts', headers=headers, data={'title': 't', 'content': 'c', 'media_key': key})
+    assert response.status_code == 400
+
+
+def test_key_presigned_by_another_user_is_rejected(client, users, auth, s3_storage):
+    data = png_bytes()
+    owner, other = auth(users[0]), auth(users[1])
+    key = presign(client, owner, data)
+    put_object(s3_storage, key, data)
+    assert client.post('/api/posts', headers=owner, data={'title': 't', 'content': 'c', 'media_key': key,
+                                                          'visibility': 'Private'}).status_code == 201
+    response = client.post('/api/posts', headers=other, data={'title': 't', 'content': 'c', 'media_key': key})
+    assert response.status_code == 400
+    assert response.json['msg'] == 'Upload not found.'
+    post_id = client.post('/api/posts', headers=other, data={'title': 't', 'content': 'c'}).json['id']
+    assert client.put(f'/api/posts/{post_id}', headers=other, json={'media_key': key}).status_code == 400
+    assert client.post('/api/profile/image', headers=other, data={'media_key': key}).status_code == 400
@@ -0,0 +1,131 @@
+"""Image renditions."""
+import struct
+import threading
+
+import pytest
+from PIL import Image
+
+from models.media import MediaJob
+from services import images
+from services.storage import get_storage, staging_path
+
+
+def store(image, key, fmt='PNG'):
+    path = staging_path()
+    image.save(path, fmt)
+    get_storage().save(key, path)
+    return key
+
+
+def test_concurrent_rendering(app):
+    key = store(Image.new('RGB', (900, 600), (10, 120, 200)), 'cd' * 32 + '.png')
+    variant = images.variant_names(key)['480']
+    for _ in range(5):
+        get_storage().delete(variant)
+        errors = []
+
+        def render():
+            try:
+                images.generate_variants(key)
+            except Exception as e:  # collected so the main thread fails the test
+                errors.append(e)
+        threads = [threading.Thread(target=render) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        with get_storage().local_copy(variant) as path:
+            assert Image.open(path).width == 480
+
+
+def test_missing_rendition_is_queued_not_rendered(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MEDIA_URL_SIGNING', 'off')
+    key = store(Image.new('RGB', (900, 600), (10, 120, 200)), 'ce' * 32 + '.png')
+    variant = images.variant_names(key)['480']
+    response = client.get(f'/uploads/v1/{variant}')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(f'/uploads/v1/{key}')
+    assert not get_storage().exists(variant)
+    with app.app_context():
+        assert [(job.key, job.kind) for job in MediaJob.query] == [(key, 'variants')]
+    client.get(f'/uploads/v1/{variant}')  # asking again doesn't queue it twice
+    with app.app_context():
+        assert MediaJob.query.count() == 1
+    assert client.get('/uploads/v1/' + 'cf' * 32 + '.w480.jpg').status_code == 404  # no original
+
+
+def test_alternates_keep_transparency(app):
+    image = Image.new('RGBA', (600, 400), (255, 0, 0, 255))
+    image.paste((0, 0, 0, 0), (0, 0, 50, 50))
+    key = store(image, '0a' * 32 + '.png')
+    images.generate_variants(key)
+    for name in [images.alternate_name(key, fmt) for fmt in images.ALTERNATE_FORMATS] + \
+            [images.alternate_name(images.variant_names(key)['480'], fmt) for fmt in images.ALTERNATE_FORMATS]:
+        with get_storage().local_copy(name) as path:
+            rendered = Image.open(path)
+            rendered.load()
+        assert rendered.mode == 'RGBA', name
+        assert rendered.getpixel((0, 0))[3] == 0, name
+    with get_storage().local_copy(images.variant_names(key)['480']) as path:
+        assert Image.open(path).convert('RGB').getpixel((0, 0)) == (255, 255, 255)  # JPEG: flattened onto white
+
+
+def rgb_profile(red, green, blue, gamma=2.2):
+    """A minimal ICC v2 matrix/TRC display profile with the given D50 colorants"""
+    def s15(values):
+        return b''.join(struct.pack('>i', round(v * 65536)) for v in values)
+
+    def xyz(values):
+        return b'XYZ \0\0\0\0' + s15(values)
+    curve = b'curv\0\0\0\0' + struct.pack('>IH', 1, round(gamma * 256)) + b'\0\0'
+    name = b'test profile\0'
+    desc = b'desc\0\0\0\0' + struct.pack('>I', len(name)) + name + b'\0' * 8 + b'\0' * 3 + b'\0' * 67
+    tags = [(b'desc', desc), (b'wtpt', xyz((0.9642, 1.0, 0.8249))), (b'rXYZ', xyz(red)), (b'gXYZ', xyz(green)),
+            (b'bXYZ', xyz(blue)), (b'rTRC', curve), (b'gTRC', curve), (b'bTRC', curve),
+            (b'cprt', b'text\0\0\0\0none\0')]
+    offset = 128 + 4 + 12 * len(tags)
+    table, data = b'', b''
+    for signature, body in tags:
+        body += b'\0' * (-len(body) % 4)
+        table += signature + struct.pack('>II', offset + len(data), len(body))
+        data += body
+    size = offset + len(data)
+    header = (struct.pack('>I', size) + b'none' + bytes([2, 0x10, 0, 0]) + b'mntrRGB XYZ ' + b'\0' * 12 + b'acsp'
+              + b'\0' * 24 + struct.pack('>I', 0) + s15((0.9642, 1.0, 0.8249)) + b'\0' * 48)
+    return header + struct.pack('>I', len(tags)) + table + data
+
+
+# sRGB's D50-adapted colorants
+SRGB_RED, SRGB_GREEN, SRGB_BLUE = (0.4361, 0.2225, 0.0139), (0.3851, 0.7169, 0.0971), (0.1431, 0.0606, 0.7141)
+
+
+@pytest.mark.parametrize('mode', ['RGB', 'RGBA'])
+def test_embedded_profile_is_converted_to_srgb(app, mode):
+    # A profile whose "red" channel is sRGB green: the converted pixels must come out green
+    swapped = rgb_profile(SRGB_GREEN, SRGB_RED, SRGB_BLUE)
+    image = Image.new(mode, (300, 200), (255, 0, 0, 255)[:len(mode)])
+    path = staging_path()
+    image.save(path, 'PNG', icc_profile=swapped)
+    key = '0b' * 32 + '.png'
+    get_storage().save(key, path)
+    images.generate_variants(key)
+    names = [images.variant_names(key)['160']] + [images.alternate_name(key, fmt) for fmt in images.ALTERNATE_FORMATS]
+    for name in names:
+        with get_storage().local_copy(name) as rendered_path:
+            rendered = Image.open(rendered_path)
+            rendered.load()
+        assert 'icc_profile' not in rendered.info, name
+        red, green, blue = rendered.convert('RGB').getpixel((10, 10))
+        assert green > 200 and red < 60 and blue < 60, (name, red, green, blue)
+
+
+def test_unreadable_profile_keeps_the_pixels(app):
+    path = staging_path()
+    Image.new('RGB', (300, 200), (200, 30, 30)).save(path, 'PNG', icc_profile=b'not a profile')
+    key = '0c' * 32 + '.png'
+    get_storage().save(key, path)
+    images.generate_variants(key)
+    with get_storage().local_copy(images.variant_names(key)['160']) as rendered_path:
+        red, green, blue = Image.open(rendered_path).getpixel((10, 10))
+    assert abs(red - 200) < 8 and green < 45 and blue < 45
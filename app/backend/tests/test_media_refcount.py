@@ -0,0 +1,98 @@
+"""Post media: content-addressed storage shared between posts, reference counting and processing state."""
+import io
+
+from PIL import Image
+
+from models import db
+from models.media import MediaBlob
+from models.post import Post
+from services import media
+from services.storage import get_storage
+
+
+def png(color=(200, 30, 30)):
+    data = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(data, 'PNG')
+    return data.getvalue()
+
+
+def create_post(client, headers, image):
+    response = client.post('/api/posts', headers=headers, content_type='multipart/form-data',
+                           data={'title': 't', 'content': 'c', 'media': (io.BytesIO(image), 'photo.png')})
+    assert response.status_code == 201, response.json
+    return response.json['id']
+
+
+def blob(app, key):
+    with app.app_context():
+        row = db.session.get(MediaBlob, key)
+        return row.ref_count if row else None
+
+
+def stored_key(app, post_id):
+    with app.app_context():
+        return db.session.get(Post, post_id).media_url
+
+
+def test_same_content_is_stored_once(client, users, auth, app):
+    headers = auth(users[0])
+    image = png()
+    first, second = create_post(client, headers, image), create_post(client, auth(users[1]), image)
+    key = stored_key(app, first)
+    assert stored_key(app, second) == key
+    assert blob(app, key) == 2
+    assert get_storage().exists(key)
+
+
+def test_file_is_removed_with_its_last_reference(client, users, auth, app):
+    headers = auth(users[0])
+    image = png()
+    first, second = create_post(client, headers, image), create_post(client, headers, image)
+    key = stored_key(app, first)
+    assert client.delete(f'/api/posts/{first}', headers=headers).status_code == 200
+    assert blob(app, key) == 1
+    assert get_storage().exists(key)
+    assert client.delete(f'/api/posts/{second}', headers=headers).status_code == 200
+    assert blob(app, key) is None
+    assert not get_storage().exists(key)
+
+
+def test_replacing_media_with_the_same_file_keeps_it(client, users, auth, app):
+    headers = auth(users[0])
+    image = png()
+    post_id = create_post(client, headers, image)
+    key = stored_key(app, post_id)
+    response = client.put(f'/api/posts/{post_id}', headers=headers, content_type='multipart/form-data',
+                          data={'title': 't', 'content': 'c', 'media': (io.BytesIO(image), 'again.png')})
+    assert response.status_code == 200
+    assert blob(app, key) == 1
+    assert get_storage().exists(key)
+
+
+def test_acquire_counts_rows_inserted_concurrently(app):
+    key = 'ab' * 32 + '.png'
+    with app.app_context():
+        # Another request inserted the row after this one found none
+        MediaBlob.add_reference(key, 'ab' * 32, 10)
+        MediaBlob.add_reference(key, 'ab' * 32, 10)
+        media.acquire(key)
+        db.session.commit()
+        assert db.session.get(MediaBlob, key).ref_count == 3
+    with app.app_context():
+        media.release(key)
+        db.session.commit()
+        assert db.session.get(MediaBlob, key).ref_count == 2
+
+
+def test_variants_are_linked_once_processing_is_done(client, users, auth, app):
+    headers = auth(users[0])
+    post_id = create_post(client, headers, png())
+    [post] = client.get('/api/posts', headers=headers).json['posts']
+    assert post['media_status'] == 'processing'
+    assert post['media_variants'] is None
+    assert client.get('/api/my-posts', headers=headers).json[0]['media_variants'] is None
+    with app.app_context():
+        db.session.get(Post, post_id).media_status = 'ready'
+        db.session.commit()
+    [post] = client.get('/api/posts', headers=headers).json['posts']
+    assert set(post['media_variants']) >= {'thumb', '480'}
@@ -0,0 +1,68 @@
+"""Serving /uploads: streamed by Flask or handed to the proxy (MEDIA_OFFLOAD)."""
+import os
+
+import pytest
+
+from services.storage import UPLOAD_FOLDER, get_storage, media_path, staging_path
+
+KEY = 'ab' * 32 + '.mp4'
+BODY = bytes(range(256)) * 400  # 102400 bytes
+
+
+@pytest.fixture
+def stored(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MEDIA_URL_SIGNING', 'off')
+    path = staging_path()
+    with open(path, 'wb') as f:
+        f.write(BODY)
+    get_storage().save(KEY, path)
+    return f'/uploads/v1/{KEY}'
+
+
+def test_flask_streams_ranges_itself(client, stored, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'MEDIA_OFFLOAD', 'none')
+    assert client.get(stored).data == BODY
+    response = client.get(stored, headers={'Range': 'bytes=0-99'})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes 0-99/{len(BODY)}'
+    assert response.data == BODY[:100]
+
+
+@pytest.mark.parametrize('mode, header', [('x-sendfile', 'X-Sendfile'), ('x-accel', 'X-Accel-Redirect')])
+@pytest.mark.parametrize('range_header', [None, 'bytes=0-99'])
+def test_offload_leaves_body_and_ranges_to_the_proxy(client, stored, monkeypatch, mode, header, range_header):
+    monkeypatch.setitem(client.application.config, 'MEDIA_OFFLOAD', mode)
+    response = client.get(stored, headers={'Range': range_header} if range_header else {})
+    assert response.status_code == 200
+    assert response.data == b''
+    assert 'Content-Range' not in response.headers
+    assert 'Content-Length' not in response.headers
+    assert response.headers[header].endswith(KEY)
+    assert response.headers['Content-Type'] == 'video/mp4'
+
+
+def test_fingerprinted_media_is_immutable(client, stored):
+    response = client.get(stored)
+    assert response.headers['ETag'] == f'"{KEY}"'
+    cache_control = response.headers['Cache-Control']
+    assert 'immutable' in cache_control and f'max-age={client.application.config["MEDIA_CACHE_MAX_AGE"]}' in cache_control
+
+
+def test_revalidation_is_answered_without_the_file(client, stored):
+    os.remove(media_path(KEY))  # a 304 must come from the name alone
+    response = client.get(stored, headers={'If-None-Match': f'"{KEY}"'})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == f'"{KEY}"'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert client.get(stored, headers={'If-None-Match': '"something-else"'}).status_code == 404
+
+
+def test_legacy_names_are_revalidated(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MEDIA_URL_SIGNING', 'off')
+    with open(os.path.join(UPLOAD_FOLDER, '1_1700000000_clip.mp4'), 'wb') as f:  # flat, as legacy files are
+        f.write(BODY)
+    response = client.get('/uploads/v1/1_1700000000_clip.mp4')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+    assert client.get('/uploads/v1/1_1700000000_clip.mp4',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
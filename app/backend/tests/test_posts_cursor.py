@@ -0,0 +1,70 @@
+"""Keyset pagination on /api/posts: following next_cursor visits every post once, in order."""
+import base64
+import json
+
+import pytest
+
+
+def encode(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def walk(client, headers, **params):
+    """Follow next_cursor from the first page to the last; returns the posts in order"""
+    posts, cursor = [], ''
+    while True:
+        query = '&'.join(f'{k}={v}' for k, v in {**params, 'cursor': cursor}.items())
+        response = client.get(f'/api/posts?{query}', headers=headers)
+        assert response.status_code == 200
+        posts.extend(response.json['posts'])
+        cursor = response.json['next_cursor']
+        assert response.json['has_more'] == (cursor is not None)
+        if cursor is None:
+            return posts
+
+
+@pytest.mark.parametrize('sort_by', ['created_at', 'likes_count', 'views_count'])
+@pytest.mark.parametrize('sort_order', ['asc', 'desc'])
+def test_cursor_walk_visits_every_post_once(client, users, auth, make_posts, sort_by, sort_order):
+    ids = make_posts(23, users)  # ties on every sort column, so the id tiebreak matters
+    posts = walk(client, auth(users[0]), per_page=5, sort_by=sort_by, sort_order=sort_order)
+    assert sorted(p['id'] for p in posts) == sorted(ids)
+    keys = [(p[sort_by], p['id']) for p in posts]
+    assert keys == sorted(keys, reverse=sort_order == 'desc')
+
+
+def test_cursor_walk_with_filter(client, users, auth, make_posts):
+    make_posts(23, users)
+    posts = walk(client, auth(users[0]), per_page=4, category='tech')
+    assert len(posts) == 11
+    assert {p['category'] for p in posts} == {'tech'}
+
+
+def test_cursor_is_not_shifted_by_new_posts(client, users, auth, make_posts):
+    make_posts(10, users)
+    headers = auth(users[0])
+    first = client.get('/api/posts?per_page=5&cursor=&sort_order=asc', headers=headers).json
+    make_posts(3, users)  # these sort before the cursor; with offsets they would push post 4 onto page two
+    second = client.get(f'/api/posts?per_page=5&sort_order=asc&cursor={first["next_cursor"]}', headers=headers).json
+    assert [p['title'] for p in second['posts']] == [f'post {i}' for i in range(5, 10)]
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-base64!',
+    encode(['v', 1]),
+    encode({'s': 'created_at', 'o': 'desc', 'id': 1}),
+    encode({'s': 'created_at', 'o': 'desc', 'v': 1, 'id': 1}),
+    encode({'s': 'created_at', 'o': 'desc', 'v': 'yesterday', 'id': 1}),
+    encode({'s': 'created_at', 'o': 'desc', 'v': '2025-01-01T00:00:00', 'id': 'x'}),
+    encode({'s': 'likes_count', 'o': 'desc', 'v': 1, 'id': 1}),  # issued for another sort
+])
+def test_invalid_cursor_is_rejected(client, users, auth, cursor):
+    response = client.get(f'/api/posts?cursor={cursor}', headers=auth(users[0]))
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('per_page', ['0', '-1', 'ten', '', '101'])
+def test_invalid_per_page_is_rejected(client, users, auth, make_posts, per_page):
+    make_posts(3, users)
+    response = client.get(f'/api/posts?cursor=&per_page={per_page}', headers=auth(users[0]))
+    assert response.status_code == 400
@@ -0,0 +1,78 @@
+"""The posts listing runs a fixed number of queries, however many posts a page holds."""
+import pytest
+
+from models import db
+from models.post import Post
+
+
+def listing_queries(client, headers, count_queries, per_page, **params):
+    query = '&'.join(f'{k}={v}' for k, v in {'per_page': per_page, **params}.items())
+    client.get(f'/api/posts?{query}', headers=headers)  # warm the categories/tags cache
+    with count_queries() as statements:
+        response = client.get(f'/api/posts?{query}', headers=headers)
+    assert response.status_code == 200
+    assert len(response.json['posts']) == per_page
+    return len(statements)
+
+
+@pytest.mark.parametrize('params', [{}, {'cursor': ''}, {'count': 'none'}])
+def test_query_count_does_not_grow_with_page_size(client, users, auth, make_posts, count_queries, params):
+    make_posts(60, users)
+    headers = auth(users[0])
+    small = listing_queries(client, headers, count_queries, 5, **params)
+    large = listing_queries(client, headers, count_queries, 50, **params)
+    assert small == large
+    assert large <= 4
+
+
+def test_my_posts_query_count_does_not_grow(client, users, auth, make_posts, count_queries):
+    headers = auth(users[0])
+    make_posts(4, users[:1])
+    with count_queries() as few:
+        client.get('/api/my-posts', headers=headers)
+    make_posts(40, users[:1])
+    with count_queries() as many:
+        response = client.get('/api/my-posts', headers=headers)
+    assert len(response.json) == 44
+    assert len(few) == len(many)
+
+
+def tagged_posts(app, ids, tags):
+    with app.app_context():
+        for post_id, post_tags in zip(ids, tags):
+            db.session.get(Post, post_id).set_tags(post_tags)
+        db.session.commit()
+
+
+def listed_ids(client, headers, **params):
+    query = '&'.join(f'{k}={v}' for k, v in params.items())
+    response = client.get(f'/api/posts?{query}', headers=headers)
+    assert response.status_code == 200
+    return sorted(p['id'] for p in response.json['posts'])
+
+
+def test_tag_filter_matches_whole_tags(client, users, auth, app, make_posts):
+    java, javascript, both = make_posts(3, users)
+    tagged_posts(app, [java, javascript, both], ['java', 'javascript', 'Java, JavaScript'])
+    headers = auth(users[0])
+    assert listed_ids(client, headers, tags='java') == [java, both]
+    assert listed_ids(client, headers, tags='javascript') == [javascript, both]
+
+
+def test_every_requested_tag_must_match(client, users, auth, app, make_posts):
+    flask_only, python_only, both, unrelated = make_posts(4, users)
+    tagged_posts(app, [flask_only, python_only, both, unrelated], ['flask', 'python', 'python,flask,web', 'rust'])
+    headers = auth(users[0])
+    assert listed_ids(client, headers, tags='python,flask') == [both]
+    assert listed_ids(client, headers, tags=' Flask , python ,') == [both]
+    assert listed_ids(client, headers, tags='python,go') == []
+
+
+@pytest.mark.parametrize('params', [
+    'sort_by=title', 'sort_by=id;drop', 'sort_by=relevance', 'sort_order=up', 'sort_order=DESC',
+    'cursor=&sort_by=relevance&search=post',
+])
+def test_unknown_sort_is_rejected(client, users, auth, make_posts, params):
+    make_posts(3, users)
+    response = client.get(f'/api/posts?{params}', headers=auth(users[0]))
+    assert response.status_code == 400
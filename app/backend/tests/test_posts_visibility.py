@@ -0,0 +1,20 @@
+"""Private posts, and the signed links to their media, are only listed for their author."""
+from models import db
+from models.post import Post
+
+
+def test_private_posts_are_listed_for_their_author_only(client, users, auth, make_posts, app):
+    alice, bob = users
+    make_posts(2, [alice])
+    [private] = make_posts(1, [alice])
+    with app.app_context():
+        db.session.get(Post, private).visibility = 'Private'
+        db.session.commit()
+    own = client.get('/api/posts?count=cached', headers=auth(alice)).json
+    other = client.get('/api/posts?count=cached', headers=auth(bob)).json
+    assert private in [p['id'] for p in own['posts']]
+    assert private not in [p['id'] for p in other['posts']]
+    assert (own['total'], other['total']) == (3, 2)  # cached counts are per viewer
+    assert client.get('/api/posts?cursor=&visibility=Private', headers=auth(bob)).json['posts'] == []
+    assert client.get(f'/api/posts/{private}/media-status', headers=auth(bob)).status_code == 404
+    assert client.get(f'/api/posts/{private}/media-status', headers=auth(alice)).status_code == 200
@@ -0,0 +1,21 @@
+"""Conditional GET /api/profile: the ETag follows profile_version."""
+
+
+def test_profile_etag_changes_after_an_edit(client, users, auth):
+    headers = auth(users[0])
+    first = client.get('/api/profile', headers=headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert client.get('/api/profile', headers={**headers, 'If-None-Match': etag}).status_code == 304
+    assert client.put('/api/profile', headers=headers, json={'title': 'Engineer'}).status_code == 200
+    changed = client.get('/api/profile', headers={**headers, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.json['title'] == 'Engineer'
+    assert changed.headers['ETag'] != etag
+
+
+def test_profile_etag_is_per_user(client, users, auth):
+    headers = auth(users[0])
+    etag = client.get('/api/profile', headers=headers).headers['ETag']
+    client.put('/api/profile', headers=auth(users[1]), json={'title': 'Designer'})
+    assert client.get('/api/profile', headers={**headers, 'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,88 @@
+"""Resumable uploads (/api/uploads): chunked writes, resuming, finalizing and attaching to a post."""
+import hashlib
+import io
+
+from PIL import Image
+
+from models import db
+from models.media import MediaBlob
+from services import resumable
+from services.storage import get_storage
+
+CHUNK = resumable.CHUNK_SIZE
+
+
+def image_bytes():
+    """A PNG a little over two chunks long"""
+    data = io.BytesIO()
+    Image.frombytes('RGB', (800, 1000), bytes(range(256)) * 9375).save(data, 'PNG', compress_level=0)
+    return data.getvalue()
+
+
+def start(client, headers, data, filename='big.png'):
+    response = client.post('/api/uploads', headers=headers, json={'filename': filename, 'size': len(data)})
+    assert response.status_code == 201
+    return response.json['upload_id']
+
+
+def put(client, headers, upload_id, data, offset):
+    return client.put(f'/api/uploads/{upload_id}?offset={offset}', headers=headers,
+                      data=data[offset:offset + CHUNK], content_type='application/octet-stream')
+
+
+def test_chunked_upload_resume_and_attach(client, users, auth, app):
+    headers = auth(users[0])
+    data = image_bytes()
+    assert 2 * CHUNK < len(data) < 3 * CHUNK
+    upload_id = start(client, headers, data)
+    assert put(client, headers, upload_id, data, 0).json['offset'] == CHUNK
+    # The connection drops; the client asks where to continue
+    assert client.get(f'/api/uploads/{upload_id}', headers=headers).json['offset'] == CHUNK
+    # A retried chunk is rejected with the offset to resume from
+    conflict = put(client, headers, upload_id, data, 0)
+    assert conflict.status_code == 409
+    assert conflict.json['offset'] == CHUNK
+    assert put(client, headers, upload_id, data, CHUNK).status_code == 200
+    assert put(client, headers, upload_id, data, 2 * CHUNK).json['offset'] == len(data)
+    complete = client.post(f'/api/uploads/{upload_id}/complete', headers=headers)
+    assert complete.json['status'] == 'complete'
+    key = f'{hashlib.sha256(data).hexdigest()}.png'
+    assert get_storage().exists(key)
+
+    response = client.post('/api/posts', headers=headers, content_type='multipart/form-data',
+                           data={'title': 't', 'content': 'c', 'upload_id': upload_id})
+    assert response.status_code == 201
+    with app.app_context():
+        assert db.session.get(MediaBlob, key).ref_count == 1  # the session's reference moved to the post
+    # A session can only be attached once
+    again = client.post('/api/posts', headers=headers, content_type='multipart/form-data',
+                        data={'title': 't', 'content': 'c', 'upload_id': upload_id})
+    assert again.status_code == 400
+
+
+def test_completing_early_is_rejected(client, users, auth):
+    headers = auth(users[0])
+    data = image_bytes()
+    upload_id = start(client, headers, data)
+    put(client, headers, upload_id, data, 0)
+    response = client.post(f'/api/uploads/{upload_id}/complete', headers=headers)
+    assert response.status_code == 409
+    assert response.json['status'] == 'uploading'
+
+
+def test_short_chunks_and_other_users_are_rejected(client, users, auth):
+    headers = auth(users[0])
+    data = image_bytes()
+    upload_id = start(client, headers, data)
+    short = client.put(f'/api/uploads/{upload_id}?offset=0', headers=headers, data=data[:1000],
+                       content_type='application/octet-stream')
+    assert short.status_code == 409
+    assert client.get(f'/api/uploads/{upload_id}', headers=auth(users[1])).status_code == 404
+
+
+def test_content_must_match_the_extension(client, users, auth):
+    headers = auth(users[0])
+    data = b'not an image at all' * 10
+    upload_id = start(client, headers, data, filename='fake.png')
+    put(client, headers, upload_id, data, 0)
+    assert client.post(f'/api/uploads/{upload_id}/complete', headers=headers).status_code == 400
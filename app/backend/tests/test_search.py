@@ -0,0 +1,63 @@
+"""Full-text search on /api/posts?search= (SQLite FTS5 backend)."""
+from models import db
+from models.post import Post
+from models.user import User
+from services.search import init_search, make_snippet
+
+
+def add_post(app, user_id, title, content):
+    with app.app_context():
+        post = Post(user_id=user_id, title=title, content=content, visibility='Public')
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def search(client, headers, term):
+    response = client.get(f'/api/posts?search={term}', headers=headers)
+    assert response.status_code == 200
+    return response.json['posts']
+
+
+def test_snippet_escapes_content(client, users, auth, app):
+    add_post(app, users[0], 'xss', 'hello <img src=x onerror=alert(1)> hello')
+    [post] = search(client, auth(users[0]), 'hello')
+    assert '<img' not in post['snippet']
+    assert '&lt;img src=x onerror=alert(1)&gt;' in post['snippet']
+    assert post['snippet'].count('<mark>') == 2
+
+
+def test_make_snippet_escapes_and_marks_once():
+    snippet = make_snippet('<b>mark</b> marker', ['mark', 'marker'])
+    assert snippet == '&lt;b&gt;<mark>mark</mark>&lt;/b&gt; <mark>marker</mark>'
+
+
+def test_punctuation_only_search_matches_nothing(client, users, auth, make_posts):
+    make_posts(3, users)
+    assert search(client, auth(users[0]), '!!!') == []
+
+
+def test_index_is_rebuilt_after_tables_are_recreated(client, users, auth, app):
+    add_post(app, users[0], 'alpha', 'first database')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    init_search(app)
+    with app.app_context():
+        user = User(username='carol', email='carol@example.com')
+        user.set_password('Passw0rd!')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    add_post(app, user_id, 'beta', 'second database')
+    headers = auth(user_id)
+    assert search(client, headers, 'alpha') == []
+    assert [p['title'] for p in search(client, headers, 'beta')] == ['beta']
+
+
+def test_missing_index_falls_back_to_like_search(client, users, auth, app, monkeypatch):
+    """init_search never creates MySQL/Postgres indexes; without them it searches with LIKE"""
+    monkeypatch.setitem(app.config, 'SEARCH_BACKEND', 'postgresql')
+    assert init_search(app).name == 'like'
+    add_post(app, users[0], 'gamma', 'found by LIKE')
+    assert [p['title'] for p in search(client, auth(users[0]), 'gamma')] == ['gamma']
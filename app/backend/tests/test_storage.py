@@ -0,0 +1,68 @@
+"""Media storage backends: the local uploads folder and S3 (on moto)."""
+import base64
+import os
+import time
+
+import pytest
+
+from services.storage import get_storage, media_path, staging_path
+
+
+def write_staged(data):
+    path = staging_path()
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_saving_existing_content_refreshes_it(app):
+    key = 'ef' * 32 + '.jpg'
+    get_storage().save(key, write_staged(b'jpeg bytes'))
+    week_ago = time.time() - 7 * 86400
+    os.utime(media_path(key), (week_ago, week_ago))  # an orphan gc_uploads.py is about to collect
+    duplicate = write_staged(b'jpeg bytes')
+    get_storage().save(key, duplicate)
+    assert not os.path.exists(duplicate)
+    assert os.stat(media_path(key)).st_mtime > time.time() - 60
+
+
+def test_s3_save_exists_and_derived_keys(s3_storage):
+    key = 'cd' * 32 + '.png'
+    staged = write_staged(b'png bytes')
+    s3_storage.save(key, staged)
+    assert not os.path.exists(staged)
+    assert s3_storage.exists(key)
+    assert s3_storage.size(key) == len(b'png bytes')
+    assert s3_storage.read_head(key, 3) == b'png'
+    requests = pytest.importorskip('requests')  # moto answers it in-process
+    assert requests.get(s3_storage.url(key)).content == b'png bytes'
+    for derived in (key[:-4] + '.w480.jpg', key[:-4] + '.w480.webp'):
+        s3_storage.save(derived, write_staged(b'variant'))
+    s3_storage.save('ce' * 32 + '.png', write_staged(b'other upload'))
+    assert s3_storage.derived_keys(key) == [key[:-4] + '.w480.jpg', key[:-4] + '.w480.webp']
+    s3_storage.delete(key)
+    assert not s3_storage.exists(key)
+
+
+def test_s3_links_are_stable_within_a_window(s3_storage, monkeypatch):
+    window = s3_storage.url_window
+    start = 1_000 * window
+
+    def links_at(now):
+        monkeypatch.setattr(time, 'time', lambda: now)
+        return s3_storage.url('cd' * 32 + '.png'), s3_storage.url_version()
+    first, version = links_at(start + 1)
+    assert links_at(start + window - 1) == (first, version)
+    assert 'X-Amz-Expires=7200' in first
+    later, next_version = links_at(start + window)
+    assert later != first
+    assert next_version == version + 1
+
+
+def test_s3_presigned_upload_pins_size_and_checksum(s3_storage):
+    sha256 = 'cd' * 32
+    upload = s3_storage.presign_upload(f'{sha256}.png', 9, sha256)
+    assert upload['method'] == 'PUT'
+    assert upload['headers']['Content-Length'] == '9'
+    assert upload['headers']['x-amz-checksum-sha256'] == base64.b64encode(bytes.fromhex(sha256)).decode()
+    assert f'{sha256}.png' in upload['url']
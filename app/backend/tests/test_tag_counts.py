@@ -0,0 +1,48 @@
+"""tag_counts follows post_tags through create, edit and delete; rebuild() recounts from scratch."""
+from models import db
+from models.post import PostTag, TagCount
+
+
+def counts(app):
+    with app.app_context():
+        return {row.tag: row.count for row in TagCount.query if row.count}
+
+
+def fresh_counts(app):
+    with app.app_context():
+        rows = db.session.query(PostTag.tag, db.func.count(PostTag.post_id)).group_by(PostTag.tag)
+        return dict(rows.all())
+
+
+def test_counts_follow_create_edit_and_delete(client, users, auth, app):
+    alice, bob = auth(users[0]), auth(users[1])
+    first = client.post('/api/posts', headers=alice, data={'title': 't', 'content': 'c', 'tags': 'python, Flask'})
+    assert first.status_code == 201
+    client.post('/api/posts', headers=bob, data={'title': 't', 'content': 'c', 'tags': 'python'})
+    assert counts(app) == {'python': 2, 'flask': 1}
+    client.put(f'/api/posts/{first.json["id"]}', headers=alice, json={'tags': 'flask,web'})
+    assert counts(app) == {'python': 1, 'flask': 1, 'web': 1}
+    client.delete(f'/api/posts/{first.json["id"]}', headers=alice)
+    assert counts(app) == {'python': 1}
+    assert counts(app) == fresh_counts(app)
+
+
+def test_popular_tags_are_ordered_by_count(client, users, auth):
+    headers = auth(users[0])
+    for tags in ('web', 'python,web', 'python,web,flask'):
+        client.post('/api/posts', headers=headers, data={'title': 't', 'content': 'c', 'tags': tags})
+    assert client.get('/api/posts/popular-tags', headers=headers).json['tags'] == ['web', 'python', 'flask']
+
+
+def test_rebuild_matches_a_fresh_count(client, users, auth, app):
+    headers = auth(users[0])
+    for tags in ('a,b', 'b,c', 'c'):
+        client.post('/api/posts', headers=headers, data={'title': 't', 'content': 'c', 'tags': tags})
+    with app.app_context():
+        # Counters drifted, e.g. by rows written before tag_counts existed
+        TagCount.query.filter_by(tag='b').update({'count': 7})
+        db.session.add(TagCount(tag='stale', count=3))
+        db.session.commit()
+        TagCount.rebuild()
+        db.session.commit()
+    assert counts(app) == fresh_counts(app) == {'a': 1, 'b': 2, 'c': 2}
@@ -0,0 +1,43 @@
+"""Uploads are size-limited while streaming and checked against their extension."""
+import io
+import os
+
+from api.posts import MAX_FILE_SIZE
+from models.post import Post
+from services.storage import UPLOAD_FOLDER
+
+
+def stored_files():
+    return {os.path.join(root, name) for root, _, names in os.walk(UPLOAD_FOLDER) for name in names}
+
+
+def post_media(client, headers, name, data):
+    return client.post('/api/posts', headers=headers, content_type='multipart/form-data',
+                       data={'title': 't', 'content': 'c', 'media': (io.BytesIO(data), name)})
+
+
+def test_oversized_upload_is_cut_off_while_streaming(client, users, auth, app):
+    before = stored_files()
+    # Just over the limit, so the declared length passes and the streaming check has to catch it
+    response = post_media(client, auth(users[0]), 'clip.mp4', b'\0' * (MAX_FILE_SIZE + 1024))
+    assert response.status_code == 413
+    assert response.json['msg'] == 'File too large (max 10MB).'
+    assert stored_files() == before
+    with app.app_context():
+        assert Post.query.count() == 0
+
+
+def test_declared_oversized_body_is_refused_up_front(client, users, auth):
+    response = post_media(client, auth(users[0]), 'clip.mp4', b'\0' * (MAX_FILE_SIZE + 256 * 1024))
+    assert response.status_code == 413
+    assert response.json['msg'] == 'File too large (max 10MB).'
+
+
+def test_content_must_match_the_extension(client, users, auth, app):
+    before = stored_files()
+    response = post_media(client, auth(users[0]), 'photo.jpg', b'#!/bin/sh\necho not an image\n' * 20)
+    assert response.status_code == 400
+    assert response.json['msg'] == 'Invalid media file type.'
+    assert stored_files() == before
+    with app.app_context():
+        assert Post.query.count() == 0
@@ -0,0 +1,74 @@
+"""Video posters and metadata from the media worker (services/video.py)."""
+import io
+import subprocess
+
+import pytest
+from PIL import Image
+
+from models import db
+from models.media import MediaJob
+from models.post import Post
+from services import media_jobs, video
+from services.storage import media_path
+
+
+def upload(client, headers, name, data):
+    response = client.post('/api/posts', headers=headers, content_type='multipart/form-data',
+                           data={'title': 't', 'content': 'c', 'media': (io.BytesIO(data), name)})
+    assert response.status_code == 201
+    return response.json['id']
+
+
+def run_pending_jobs(app):
+    """One pass of media_worker.py, in-process"""
+    with app.app_context():
+        for job in media_jobs.claim_jobs(limit=10):
+            try:
+                result = media_jobs.run_job(job.kind, job.key)
+            except Exception as e:
+                media_jobs.finish_job(job, repr(e))
+            else:
+                media_jobs.finish_job(job, result=result)
+
+
+@pytest.fixture
+def portrait_clip(tmp_path):
+    """2s 64x32 clip whose rotation metadata turns it into a 32x64 portrait video"""
+    imageio_ffmpeg = pytest.importorskip('imageio_ffmpeg')
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+    plain, rotated = tmp_path / 'plain.mp4', tmp_path / 'rotated.mp4'
+    subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', 'testsrc=size=64x32:rate=10:duration=2',
+                    '-pix_fmt', 'yuv420p', str(plain)], check=True)
+    subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-display_rotation', '90', '-i', str(plain),
+                    '-c', 'copy', str(rotated)], check=True)
+    return rotated.read_bytes()
+
+
+def test_poster_follows_rotation(client, users, auth, app, portrait_clip):
+    headers = auth(users[0])
+    post_id = upload(client, headers, 'clip.mp4', portrait_clip)
+    run_pending_jobs(app)
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        assert post.media_status == 'ready'
+        assert (post.media_width, post.media_height, post.media_duration) == (32, 64, 2.0)
+        with Image.open(media_path(video.poster_name(post.media_url))) as poster:
+            assert poster.size == (32, 64)
+    info = client.get(f'/api/posts/{post_id}/media-status', headers=headers).json['video']
+    assert (info['width'], info['height']) == (32, 64)
+    assert '.poster.jpg' in info['poster_url']
+
+
+def test_failed_probe_marks_the_post_failed(client, users, auth, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MEDIA_JOB_MAX_ATTEMPTS', 1)
+    broken = b'\x00\x00\x00\x18ftypmp42' + b'\x00' * 4096  # an MP4 header and nothing decodable
+    post_id = upload(client, auth(users[0]), 'clip.mp4', broken)
+    run_pending_jobs(app)
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        assert post.media_status == 'failed'
+        assert post.media_width is None
+        assert not video.poster_ready(post.media_url)
+        job = MediaJob.query.filter_by(key=post.media_url).one()
+        assert job.status == 'failed' and job.error
+
@@ -0,0 +1,40 @@
+"""Buffered view counts: flushed in batches and visible to revalidating listings."""
+from services.cache import init_cache
+from services.view_counter import ViewCounter, get_view_counter
+
+
+def test_flush_writes_buffered_views(client, users, auth, make_posts, app):
+    [post_id] = make_posts(1, users)
+    headers = auth(users[0])
+    for _ in range(3):
+        assert client.post(f'/api/posts/{post_id}/view', headers=headers).status_code == 204
+    with app.app_context():
+        get_view_counter().flush()
+    assert client.get('/api/posts', headers=headers).json['posts'][0]['views_count'] == 3
+
+
+def test_flush_invalidates_listing_etags(client, users, auth, make_posts, app):
+    [post_id] = make_posts(1, users)
+    headers = auth(users[0])
+    etag = client.get('/api/posts', headers=headers).headers['ETag']
+    assert client.get('/api/posts', headers={**headers, 'If-None-Match': etag}).status_code == 304
+    client.post(f'/api/posts/{post_id}/view', headers=headers)
+    with app.app_context():
+        get_view_counter().flush()
+    response = client.get('/api/posts', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['posts'][0]['views_count'] == 1
+
+
+def test_flush_in_another_worker_invalidates_listing_etags(client, users, auth, make_posts, app):
+    """Workers share nothing but the database; a flush elsewhere still changes this worker's ETag"""
+    [post_id] = make_posts(1, users)
+    headers = auth(users[0])
+    etag = client.get('/api/posts', headers=headers).headers['ETag']
+    other_worker = ViewCounter(app)
+    other_worker.record(post_id, 2)
+    other_worker.flush()
+    init_cache(app)  # this worker's in-process cache knows nothing of that flush
+    response = client.get('/api/posts', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['posts'][0]['views_count'] == 2
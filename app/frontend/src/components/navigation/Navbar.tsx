@@ -5,6 +5,7 @@ import { Link } from 'react-router-dom';
 const Navbar: React.FC = () => {
   const { profile, user } = useAuth();
   const avatar = profile?.avatar;
+  const avatarUrl = profile?.avatar_url;
   const username = profile?.username || user?.username;
   console.log('[DEBUG Navbar] avatar:', avatar);
   return (
@@ -17,9 +18,9 @@ const Navbar: React.FC = () => {
           <div className="flex items-center">
             <Link to="/profile">
               <div className="w-10 h-10 bg-blue-200 rounded-full flex items-center justify-center text-xl font-bold text-blue-800 overflow-hidden">
-                {typeof avatar === 'string' && avatar ? (
+                {typeof avatarUrl === 'string' && avatarUrl ? (
                   <img
-                    src={`${window.location.hostname !== 'localhost' && window.location.hostname !== '127.0.0.1' ? 'https://intern-3ypr.onrender.com' : 'http://localhost:5000'}/uploads/${avatar}`}
+                    src={avatarUrl}
                     alt="avatar"
                     className="w-full h-full object-cover"
                     onError={e => { (e.target as HTMLImageElement).style.display = 'none'; }}
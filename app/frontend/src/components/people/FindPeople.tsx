@@ -103,8 +103,8 @@ const FindPeople: React.FC = () => {
               <button onClick={() => setProfilePreview(null)} className="absolute top-2 right-2 text-gray-400 hover:text-gray-700 text-xl">&times;</button>
               <div className="flex flex-col items-center">
                 <div className="w-20 h-20 rounded-full overflow-hidden mb-3 bg-cyan-200 flex items-center justify-center text-3xl font-bold text-white">
-                  {profilePreview.avatar ? (
-                    <img src={profilePreview.avatar} alt={profilePreview.username} className="w-full h-full object-cover" />
+                  {profilePreview.avatar_url ? (
+                    <img src={profilePreview.avatar_url} alt={profilePreview.username} className="w-full h-full object-cover" />
                   ) : (
                     profilePreview.username[0]?.toUpperCase() || '?' 
                   )}
@@ -194,9 +194,9 @@ const FindPeople: React.FC = () => {
                   <div className="flex items-center mb-2 justify-between">
                     <div className="flex items-center space-x-3">
                       <div className="w-12 h-12 rounded-full flex items-center justify-center text-lg font-bold text-white overflow-hidden" style={{ backgroundColor: '#09D0EF' }}>
-                        {user.avatar ? (
+                        {user.avatar_url ? (
                           <img 
-                            src={user.avatar} 
+                            src={user.avatar_url} 
                             alt={user.username} 
                             className="w-full h-full object-cover"
                           />
@@ -5,6 +5,7 @@ export interface User {
   username: string;
   title?: string;
   avatar?: string;
+  avatar_url?: string;
   location?: string;
   bio?: string;
   connections?: number;
@@ -1,5 +1,6 @@
 import React, { useEffect, useState, useCallback } from 'react';
 import { postsApi } from './api';
+import { isImageUrl, isVideoUrl } from './media';
 import { Link } from 'react-router-dom';
 import { FaEllipsisV, FaRegHeart, FaHeart, FaShareAlt, FaEdit, FaTrash } from 'react-icons/fa';
 import PersistentNav from '../navigation/PersistentNav';
@@ -74,9 +75,9 @@ const MyPosts: React.FC = () => {
       }
       // Filter by media type
       if (mediaType === 'Images') {
-        filtered = filtered.filter(post => post.media_url && post.media_url.match(/\.(jpg|jpeg|png|gif)$/i));
+        filtered = filtered.filter(post => isImageUrl(post.media_url));
       } else if (mediaType === 'Videos') {
-        filtered = filtered.filter(post => post.media_url && post.media_url.match(/\.(mp4|mov|avi|webm)$/i));
+        filtered = filtered.filter(post => isVideoUrl(post.media_url));
       }
       // Sort
       filtered = filtered.sort((a, b) =>
@@ -331,7 +332,7 @@ const MyPosts: React.FC = () => {
                       
                       {post.media_url && (
                         <div className="mb-4">
-                          {post.media_url.match(/\.(jpg|jpeg|png|gif)$/i) ? (
+                          {isImageUrl(post.media_url) ? (
                             <img
                               src={post.media_url}
                               alt="Post media"
@@ -341,7 +342,7 @@ const MyPosts: React.FC = () => {
                                 (e.target as HTMLImageElement).style.display = 'none';
                               }}
                             />
-                          ) : post.media_url.match(/\.(mp4|mov|avi|webm)$/i) ? (
+                          ) : isVideoUrl(post.media_url) ? (
                             <video
                               src={post.media_url}
                               controls
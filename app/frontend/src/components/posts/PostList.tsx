@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { postsApi } from './api';
+import { isImageUrl, isVideoUrl } from './media';
 import { useAuth } from '../../context/AuthContext';
 import { FaRegHeart, FaHeart, FaRegComment, FaShareAlt } from 'react-icons/fa';
 
@@ -144,7 +145,7 @@ const PostList: React.FC = () => {
             </div>
             <div className="font-semibold text-lg text-black mb-1">{post.title}</div>
             <div className="text-gray-700 mb-2">{post.content}</div>
-            {post.media_url && post.media_url.match(/\.(jpg|jpeg|png|gif)$/i) && (
+            {isImageUrl(post.media_url) && (
               <img
                 src={post.media_url}
                 alt="media"
@@ -152,7 +153,7 @@ const PostList: React.FC = () => {
                 onClick={() => setPreviewImg(post.media_url!)}
               />
             )}
-            {post.media_url && post.media_url.match(/\.(mp4|mov|avi|webm)$/i) && (
+            {isVideoUrl(post.media_url) && (
               <video src={post.media_url} controls className="rounded-lg mb-2 max-h-64 w-full" />
             )}
             <div className="flex items-center text-gray-500 text-sm mt-2">
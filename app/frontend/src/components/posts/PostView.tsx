@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { postsApi } from './api';
+import { isImageUrl } from './media';
 
 interface Post {
   id: number;
@@ -118,7 +119,7 @@ const PostView: React.FC = () => {
             </div>
             {post.media_url && (
               <div className="mt-2">
-                {post.media_url.match(/\.(jpg|jpeg|png|gif)$/i) ? (
+                {isImageUrl(post.media_url) ? (
                   <img
                     src={post.media_url}
                     alt="Post Media"
@@ -163,7 +164,7 @@ const PostView: React.FC = () => {
             </div>
             {post.media_url && (
               <div className="mt-2">
-                {post.media_url.match(/\.(jpg|jpeg|png|gif)$/i) ? (
+                {isImageUrl(post.media_url) ? (
                   <img
                     src={post.media_url}
                     alt="Post Media"
@@ -0,0 +1,16 @@
+const IMAGE_EXTENSIONS = /\.(jpg|jpeg|png|gif)$/i;
+const VIDEO_EXTENSIONS = /\.(mp4|mov|avi|webm)$/i;
+
+// Media URLs carry a signature query string (and may point at a CDN or bucket),
+// so the extension is matched on the URL's path only
+const mediaPath = (url: string): string => {
+  try {
+    return new URL(url, window.location.href).pathname;
+  } catch {
+    return url;
+  }
+};
+
+export const isImageUrl = (url?: string): boolean => !!url && IMAGE_EXTENSIONS.test(mediaPath(url));
+
+export const isVideoUrl = (url?: string): boolean => !!url && VIDEO_EXTENSIONS.test(mediaPath(url));
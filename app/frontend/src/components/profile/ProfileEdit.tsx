@@ -105,6 +105,7 @@ const ProfileEdit: React.FC = () => {
   };
 
   const avatar = formData.avatar;
+  const avatarUrl = avatar ? profile?.avatar_url : undefined;
   const username = formData.username || user?.username;
 
   const validate = () => {
@@ -202,9 +203,9 @@ const ProfileEdit: React.FC = () => {
         <div className="flex flex-col md:flex-row gap-6 mb-6">
           <div className="flex flex-col items-center">
             <div className="w-32 h-32 rounded-full flex items-center justify-center text-5xl font-bold text-black overflow-hidden" style={{ backgroundColor: '#09D0EF' }}>
-              {typeof avatar === 'string' && avatar ? (
+              {typeof avatarUrl === 'string' && avatarUrl ? (
                 <img 
-                  src={`${window.location.hostname !== 'localhost' && window.location.hostname !== '127.0.0.1' ? 'https://prok-backend-66jc.onrender.com' : 'http://localhost:5000'}/uploads/${avatar}?t=${Date.now()}`}
+                  src={avatarUrl}
                   alt="avatar" 
                   className="w-full h-full object-cover" 
                   onError={e => { (e.target as HTMLImageElement).style.display = 'none'; }}
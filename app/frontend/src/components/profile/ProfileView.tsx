@@ -73,6 +73,7 @@ const ProfileView: React.FC = () => {
   };
 
   const avatar = profile?.avatar;
+  const avatarUrl = profile?.avatar_url;
   const username = profile?.username || user?.username;
   console.log('[DEBUG ProfileView] avatar:', avatar);
   const email = profile?.email || user?.email;
@@ -178,9 +179,9 @@ const ProfileView: React.FC = () => {
           <div className="flex flex-col md:flex-row items-center md:items-start gap-6">
             <div className="flex-shrink-0">
               <div className="w-32 h-32 rounded-full flex items-center justify-center text-5xl font-bold text-black overflow-hidden" style={{ backgroundColor: '#09D0EF' }}>
-                {typeof avatar === 'string' && avatar ? (
+                {typeof avatarUrl === 'string' && avatarUrl ? (
                   <img
-                    src={`${window.location.hostname !== 'localhost' && window.location.hostname !== '127.0.0.1' ? 'https://prok-backend-66jc.onrender.com' : 'http://localhost:5000'}/uploads/${avatar}?t=${Date.now()}`}
+                    src={avatarUrl}
                     alt="avatar"
                     className="w-full h-full object-cover"
                     onError={e => { (e.target as HTMLImageElement).style.display = 'none'; }}
@@ -24,6 +24,7 @@ interface Profile {
   github?: string;
   twitter?: string;
   avatar?: string;
+  avatar_url?: string;
 }
 
 interface AuthContextType {